@@ -0,0 +1,67 @@
+import logging
+import os
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from data_access import EXCLUDED_USERS, SEARCH_COUNTERS
+
+logger = logging.getLogger(__name__)
+
+# "server" uses count()/sum() aggregation queries, "live" the on_snapshot
+# listeners and "client" the snapshot scan. Server and live fall back to
+# the snapshot when unavailable.
+AGGREGATION_BACKEND = os.environ.get("DASHBOARD_AGGREGATION_BACKEND", "server")
+
+
+def _aggregation_values(aggregation_query):
+    # get() returns one list of results per result set; there is only one.
+    values = {}
+    for result in aggregation_query.get():
+        for aggregation in result if isinstance(result, list) else [result]:
+            values[aggregation.alias] = aggregation.value
+    return values
+
+
+def excluded_user_ids(db):
+    users = db.collection('users').where(filter=FieldFilter('displayName', 'in', EXCLUDED_USERS)).select([]).stream()
+    return [user.id for user in users]
+
+
+def server_usage_stats(db):
+    # Same shape as snapshot.overall_usage_stats. count() and sum() cannot
+    # filter "not in" without dropping documents missing the field, so the
+    # excluded users' few documents are read and subtracted instead. Unlike
+    # the snapshot, search-usage documents without a users document count.
+    # Returns None if the server-side path is unavailable.
+    try:
+        excluded_ids = excluded_user_ids(db)
+        total_users = _aggregation_values(db.collection('users').count(alias='total_users'))['total_users']
+
+        search_usage_ref = db.collection('search-usage')
+        sums = search_usage_ref.sum(SEARCH_COUNTERS[0], alias=SEARCH_COUNTERS[0])
+        for counter in SEARCH_COUNTERS[1:]:
+            sums = sums.sum(counter, alias=counter)
+        totals = {counter: int(value or 0) for counter, value in _aggregation_values(sums).items()}
+
+        if excluded_ids:
+            refs = [search_usage_ref.document(user_id) for user_id in excluded_ids]
+            for doc in db.get_all(refs, field_paths=SEARCH_COUNTERS):
+                if doc.exists:
+                    search_stats = doc.to_dict()
+                    for counter in SEARCH_COUNTERS:
+                        value = search_stats.get(counter)
+                        if isinstance(value, (int, float)):
+                            totals[counter] -= int(value)
+    except (exceptions.GoogleAPIError, AttributeError, KeyError) as e:
+        logger.warning("server-side aggregation unavailable, falling back: %s", e)
+        return None
+
+    return {
+        "total_users": total_users - len(excluded_ids),
+        "total_searches": sum(totals.values()),
+        "total_profile_enrichments": totals['personProfileSearches'],
+        "total_custom_research_prompts": totals['customSearches'],
+        "total_company_profiles": totals['companyProfileSearches'],
+        "total_linkedin_profiles": totals['linkedInSearches']
+    }
@@ -1,143 +1,32 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json  
-from dateutil.parser import parse
-from datetime import timedelta, datetime
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import plotly.express as px
+from datetime import datetime
+
+from bootstrap import get_db
+from data_access import PLANS, plan_update
+from instrumentation import finish_rerun, fragment, is_fragment_rerun, start_rerun
+from loaders import get_overall_rollup, get_usage_history, get_usage_stats, get_user_profile, get_user_search_index, get_worksheet_prompts, usage_stats_refreshed_at, write_user_plan
+from swr_cache import format_age
+from usage_chart import render_usage_chart
+from user_picker import render_user_picker
+from worksheets import render_worksheets_panel
 
 st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+start_rerun("Dashboard")
+
+db = get_db()
+# Starts this process's usage history sampler.
+get_usage_history(db)
+
 
-service_account_key_path = json.loads(st.secrets["firebase_service"])
-try:
-    firebase_admin.get_app()
-except ValueError as e:
-    cred = credentials.Certificate(service_account_key_path)
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()
-
-get_user_counter = 0
-get_overall_usage_bar_grpah_counter = 0
-get_user_trial_counter = 0
-get_update_user_plan_counter = 0
-get_worksheets_counter = 0
-get_feedback_counter = 0
-get_overall_stats_counter = 0
-get_overall_usage_stats_counter = 0
-get_user_stats_counter = 0
-get_search_stats_counter = 0
-
-@st.cache_data(ttl=600)
-def get_firestore_counts():
-    global get_user_counter
-    global get_overall_usage_bar_grpah_counter
-    global get_user_trial_counter
-    global get_update_user_plan_counter
-    global get_worksheets_counter
-    global get_feedback_counter
-    global get_overall_stats_counter
-    global get_overall_usage_stats_counter
-    global get_user_stats_counter
-    global get_search_stats_counter
-
-    return {
-        "get_user_counter": get_user_counter,
-        "get_overall_usage_bar_grpah_counter": get_overall_usage_bar_grpah_counter,
-        "get_user_trial_counter": get_user_trial_counter,
-        "get_update_user_plan_counter": get_update_user_plan_counter,
-        "get_worksheets_counter": get_worksheets_counter,
-        "get_feedback_counter": get_feedback_counter,
-        "get_overall_stats_counter": get_overall_stats_counter,
-        "get_overall_usage_stats_counter": get_overall_usage_stats_counter,
-        "get_user_stats_counter": get_user_stats_counter,
-        "get_search_stats_counter": get_search_stats_counter
-    }
-
-def update_counts_file():
-    counts = get_firestore_counts()
-    with open("counts.json", "w") as f:
-        json.dump(counts, f)
-
-@st.cache_data(ttl=600)
-def get_users():
-    global get_user_counter
-    users_ref = db.collection('users')
-    users = users_ref.stream()
-    get_user_counter += 1
-    return {user.id: user.to_dict().get('displayName', 'No Name') for user in users}
-
-
-@st.cache_data(ttl=600)
 def overall_users_usage_bar_graph():
-    global get_overall_usage_bar_grpah_counter
-    users_ref = db.collection('users')
-    users = users_ref.stream()
-    get_overall_usage_bar_grpah_counter += 1
-    excluded_users = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
-
-    data = []
-
-    for user in users:
-        user_data = user.to_dict()
-        if user_data.get('displayName') in excluded_users:
-            continue
-        search_stats_ref = db.collection('search-usage').document(user.id)
-        search_stats_doc = search_stats_ref.get()
-        if search_stats_doc.exists:
-            search_stats = search_stats_doc.to_dict()
-            total_searches = search_stats.get('personProfileSearches', 0) + search_stats.get('customSearches', 0) + search_stats.get('companyProfileSearches', 0) + search_stats.get('linkedInSearches', 0)
-            data.append({
-                "User": user_data.get('displayName'),
-                "Total Searches": total_searches
-            })
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values("Total Searches", ascending=True)
-
-    fig = px.bar(df, x="Total Searches", y="User", orientation='h', title="Total Searches by Users")
-    fig.update_layout(yaxis={'categoryorder':'total ascending'})
-    st.plotly_chart(fig)
-
-@st.cache_data(ttl=600)
-def get_user_trials(user_id):
-    global get_user_trial_counter
-    user_ref = db.collection('users').document(user_id)
-    user_doc = user_ref.get()
-    get_user_trial_counter += 1
-    plan = user_doc.to_dict().get('current_plan', 'No Plan')
-    trial_activation = user_doc.to_dict().get('trial_activated_date')
-    days_left = 0
-    
-    if trial_activation:
-        trial_activation_date = datetime.strptime(trial_activation, "%Y-%m-%dT%H:%M:%S.%f")
-        trial_end_date = trial_activation_date + timedelta(days=14)
-        current_date = datetime.now()
-        
-        days_left = (trial_end_date - current_date).days
-        
-        if days_left < 0:
-            days_left = 0
-
-    return plan, days_left
-
-@st.cache_data(ttl=600)
-def update_user_plan(user_id, new_plan, ):
-    global get_update_user_plan_counter
-    user_ref = db.collection('users').document(user_id)
-    update_data = {'current_plan': new_plan}
-    get_update_user_plan_counter += 1
+    rollup = get_overall_rollup(db)
+    render_usage_chart(rollup["users_usage"], rollup["version"])
 
-    if new_plan.lower() == 'trial':
-        update_data['trial_activated_date'] = datetime.now().isoformat()
-    elif new_plan.lower() == 'premium':
-        update_data['last_plan_upgrade_date'] = datetime.now().isoformat()
+def update_user_plan(user_id, new_plan, ):
+    update_data = plan_update(new_plan, datetime.now().isoformat())
 
     try:
-        user_ref.update(update_data)
+        write_user_plan(db, user_id, update_data)
         st.success(f"Plan updated to {new_plan} for user ID: {user_id}.")
         if new_plan.lower() == 'trial':
             st.success("Trial activation date updated.")
@@ -147,207 +36,119 @@ def update_user_plan(user_id, new_plan, ):
         st.error(f"Failed to update user plan: {e}")
 
 
-@st.cache_data(ttl=600)
-def get_worksheets(user_id):
-    global get_worksheets_counter
-    worksheet_doc_ref = db.collection('worksheets').document(user_id)
-    worksheet_doc = worksheet_doc_ref.get()
-    get_worksheets_counter += 1
-    return worksheet_doc.to_dict() if worksheet_doc.exists else {}
-
-@st.cache_data(ttl=600)
-def get_feedback():
-    global get_feedback_counter
-    feedback_ref = db.collection('v4-feedback')
-    feedback_docs = feedback_ref.stream()
-    get_feedback_counter += 1
-    return [doc.to_dict() for doc in feedback_docs]
-
-@st.cache_data(ttl=600)
 def get_overall_stats():
-    global get_overall_stats_counter
-    users_ref = db.collection('users')
-    users = users_ref.stream()
-    get_overall_stats_counter += 1
-    excluded_users = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
-
-    total_users = 0
-    total_worksheets = 0
-    for user in users:
-        total_users += 1
-        if user.to_dict().get('displayName') in excluded_users:
-            continue
-        worksheets_ref = db.collection('worksheets').document(user.id)
-        worksheets_doc = worksheets_ref.get()
-        if worksheets_doc.exists:
-            user_data = worksheets_doc.to_dict()
-            total_worksheets += len(user_data)
-    
-    return {"total_users": total_users, "total_worksheets": total_worksheets}
-
-@st.cache_data(ttl=600)
-def get_overall_usage_stats():
-    global get_overall_usage_stats_counter
-    global get_search_stats_counter
-    users_ref = db.collection('users')
-    users = users_ref.stream()
-    get_overall_usage_stats_counter += 1
-
-    total_users = 0
-    total_searches = 0
-    total_profile_enrichments = 0
-    total_custom_research_prompts = 0
-    total_company_profiles = 0
-    total_linkedin_profiles = 0
-
-    excluded_users = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
-
-    for user in users:
-        user_data = user.to_dict()
-        display_name = user_data.get('displayName', '')
-
-        if display_name in excluded_users:
-            continue
-
-        total_users += 1
-
-        search_stats_ref = db.collection('search-usage').document(user.id)
-        search_stats_doc = search_stats_ref.get()
-        get_search_stats_counter += 1
-        if search_stats_doc.exists:
-            search_stats = search_stats_doc.to_dict()
-            total_profile_enrichments += search_stats.get('personProfileSearches', 0) 
-            total_custom_research_prompts += search_stats.get('customSearches', 0)  
-            total_company_profiles += search_stats.get('companyProfileSearches', 0)
-            total_linkedin_profiles += search_stats.get('linkedInSearches', 0)
-        
-    total_searches += total_profile_enrichments + total_custom_research_prompts + total_company_profiles + total_linkedin_profiles
-
-    return {
-        "total_users": total_users,
-        "total_searches": total_searches,
-        "total_profile_enrichments": total_profile_enrichments,
-        "total_custom_research_prompts": total_custom_research_prompts,
-        "total_company_profiles": total_company_profiles,
-        "total_linkedin_profiles": total_linkedin_profiles
-    }
-
-@st.cache_data(ttl=600)
-def get_user_stats(user_id):
-    global get_user_stats_counter
-    search_ref = db.collection('search-usage').document(user_id)
-    search_doc = search_ref.get()
-    get_user_stats_counter += 1
-    if not search_doc.exists:
-        return {
-            "Total Searches": 0,
-            "Person Profiles Enriched": 0,
-            "Company Profiles Enriched": 0,
-            "Custom Research Prompts": 0,
-            "LinkedIn Profile Enriched": 0
-        }
-    person_profile_searches = search_doc.to_dict().get('personProfileSearches', 0)
-    company_profile_searches = search_doc.to_dict().get('companyProfileSearches', 0)
-    custom_searches = search_doc.to_dict().get('customSearches', 0)
-    linkedin_searches = search_doc.to_dict().get('linkedInSearches', 0)
-    return {
-        "Total Searches": person_profile_searches + company_profile_searches + custom_searches + linkedin_searches,
-        "Person Profiles Enriched": person_profile_searches,
-        "Company Profiles Enriched": company_profile_searches,
-        "Custom Research Prompts":  custom_searches,
-        "LinkedIn Profile Enriched": linkedin_searches
-    }
-
-st.sidebar.title("Navigation")
-selected_user_id = st.sidebar.selectbox('Select a User', options=list(get_users().keys()), format_func=lambda x: get_users()[x])
+    return get_overall_rollup(db)["overall_stats"]
 
-with st.container():
-    st.title("Dashboard")
+def get_overall_usage_stats():
+    return get_usage_stats(db)
+
+def selected_user():
+    # Fragments read the selection from session state rather than taking it
+    # as an argument, so a fragment-only rerun never acts on a stale user.
+    return st.session_state.get("dashboard_user")
+
+@fragment("Dashboard", "user picker")
+def user_picker_panel():
+    # Typing only reruns the picker; a new selection reruns the page.
+    selected_user_id = render_user_picker(get_user_search_index(db))
+    if is_fragment_rerun() and selected_user_id != selected_user():
+        st.rerun()
+    return selected_user_id
+
+@fragment("Dashboard", "overall stats")
+def overall_stats_panel():
+    overall_stats = get_overall_stats()
+    overall_usage_stats = get_overall_usage_stats()
+    rollup_updated_at = get_overall_rollup(db).get("updated_at")
+    if rollup_updated_at:
+        st.caption(f"Rollup updated at {rollup_updated_at:%Y-%m-%d %H:%M:%S %Z}")
+    usage_refreshed_at = usage_stats_refreshed_at(db)
+    if usage_refreshed_at is not None:
+        st.caption(f"Usage totals updated {format_age(usage_refreshed_at)}")
+
+    with st.expander("Overall Stats"):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            with st.container(border=True):
+                st.markdown(f"Total Users: {overall_stats['total_users']}")
 
-overall_stats = get_overall_stats()
-overall_usage_stats = get_overall_usage_stats()
+        with col2:
+            with st.container(border=True):
+                st.markdown(f"Total Worksheets: {overall_stats['total_worksheets']}")
 
-with st.expander("Overall Stats"):
-    col1, col2 = st.columns(2)
+        with st.subheader("Overall Usage Bar Graph"):
+            with st.container():
+                overall_users_usage_bar_graph()
 
-    with col1:
-        with st.container(border=True):
-            st.markdown(f"Total Users: {overall_stats['total_users']}")
 
-    with col2:
+        st.subheader("Overall Usage Stats")
         with st.container(border=True):
-            st.markdown(f"Total Worksheets: {overall_stats['total_worksheets']}")
-
-    with st.subheader("Overall Usage Bar Graph"):
-        with st.container():
-            overall_users_usage_bar_graph()
-
-
-    st.subheader("Overall Usage Stats")
-    with st.container(border=True):
-        col3, col4, col5, col6, col7 = st.columns(5)
-        
-        with col3:
-            with st.container(border=True):
-                st.markdown("Total Searches")
-                st.markdown(overall_usage_stats["total_searches"])
-        
-        with col4:
-            with st.container(border=True):
-                st.markdown("Person Profiles")
-                st.markdown(overall_usage_stats["total_profile_enrichments"])
-        
-        with col5:
-            with st.container(border=True):
-                st.markdown("Company Profiles")
-                st.markdown(overall_usage_stats["total_company_profiles"])
-        
-        with col6:
-            with st.container(border=True):
-                st.markdown("Custom Prompts")
-                st.markdown(overall_usage_stats["total_custom_research_prompts"])
-        
-        with col7:
-            with st.container(border=True):
-                st.markdown("LinkedIn Searches")
-                st.markdown(overall_usage_stats["total_linkedin_profiles"])
-
-
-if selected_user_id:
-    st.subheader(f"Worksheets for {get_users()[selected_user_id]}")
-    user_stats = get_user_stats(selected_user_id)
-    user_worksheets = get_worksheets(selected_user_id)
-    if user_worksheets:
-        for worksheet_id, worksheet_data in user_worksheets.items():
-            with st.expander(f"Worksheet: {worksheet_data.get('name', worksheet_id)}"):
-                st.write(f"Rows: {worksheet_data.get('numRows', 'N/A')}")
-                custom_research_prompts = worksheet_data.get("customResearchPrompts", {})
-                if custom_research_prompts:
-                    st.json(custom_research_prompts)
-    else:
-        st.write("No worksheets found.")
-
-with st.sidebar:
+            col3, col4, col5, col6, col7 = st.columns(5)
+            
+            with col3:
+                with st.container(border=True):
+                    st.markdown("Total Searches")
+                    st.markdown(overall_usage_stats["total_searches"])
+            
+            with col4:
+                with st.container(border=True):
+                    st.markdown("Person Profiles")
+                    st.markdown(overall_usage_stats["total_profile_enrichments"])
+            
+            with col5:
+                with st.container(border=True):
+                    st.markdown("Company Profiles")
+                    st.markdown(overall_usage_stats["total_company_profiles"])
+            
+            with col6:
+                with st.container(border=True):
+                    st.markdown("Custom Prompts")
+                    st.markdown(overall_usage_stats["total_custom_research_prompts"])
+            
+            with col7:
+                with st.container(border=True):
+                    st.markdown("LinkedIn Searches")
+                    st.markdown(overall_usage_stats["total_linkedin_profiles"])
+
+@fragment("Dashboard", "worksheets")
+def worksheets_panel():
+    user_id = selected_user()
+    st.subheader(f"Worksheets for {get_user_search_index(db).name(user_id)}")
+    render_worksheets_panel(
+        user_id,
+        get_user_profile(db, user_id).worksheets,
+        lambda worksheet_id: get_worksheet_prompts(db, user_id, worksheet_id),
+    )
+
+@fragment("Dashboard", "plan editor")
+def plan_editor_panel():
+    user_id = selected_user()
     with st.container(border=True):
         st.subheader("Update Plan")
         with st.container():
-            new_plan = st.selectbox("Select Plan", options=["Trial", "Inactive", "Premium"])
+            new_plan = st.selectbox("Select Plan", options=PLANS)
             # activation_date = st.date_input("Activation Date", min_value=datetime.now().date())
 
             if st.button("Update Plan"):
-                update_user_plan(selected_user_id, new_plan)
+                update_user_plan(user_id, new_plan)
 
-    user_stats = get_user_stats(selected_user_id)
-    if not user_stats:
-        st.write("No search data found for this user.")
-    else:
-        user_plan = get_user_trials(selected_user_id)
+    # Shown here so it reflects a plan written by the button above.
+    if get_user_profile(db, user_id).stats():
+        user_plan = get_user_profile(db, user_id).trials()
         if not user_plan:
             st.write("No plan found for this user.")
         else:
             with st.container(border=True):
                 st.markdown(f"**Plan:** {user_plan[0]}")
                 st.markdown(f"**Trial Ends in:** {user_plan[1]} days")
+
+@fragment("Dashboard", "user stats")
+def user_stats_panel():
+    user_stats = get_user_profile(db, selected_user()).stats()
+    if not user_stats:
+        st.write("No search data found for this user.")
+    else:
         with st.expander("Total Searches", expanded=True):
             st.markdown(f"{user_stats['Total Searches']}")
 
@@ -363,24 +164,29 @@ with st.sidebar:
         with st.expander("LinkedIn Profile Enriched", expanded=True):
             st.markdown(f"{user_stats['LinkedIn Profile Enriched']}")
 
+st.sidebar.title("Navigation")
+with st.sidebar:
+    selected_user_id = user_picker_panel()
+st.session_state["dashboard_user"] = selected_user_id
+
+with st.container():
+    st.title("Dashboard")
+
+overall_stats_panel()
+
+if selected_user_id is None:
+    finish_rerun()
+    st.stop()
+
+worksheets_panel()
+
+with st.sidebar:
+    plan_editor_panel()
+    user_stats_panel()
+
+
+finish_rerun()
 
-log_counter = []
-log_counter.append(get_user_counter)
-log_counter.append(get_overall_usage_bar_grpah_counter)
-log_counter.append(get_user_trial_counter)
-log_counter.append(get_update_user_plan_counter)
-log_counter.append(get_worksheets_counter)
-log_counter.append(get_feedback_counter)
-log_counter.append(get_overall_stats_counter)
-log_counter.append(get_overall_usage_stats_counter)
-log_counter.append(get_user_stats_counter)
-log_counter.append(get_search_stats_counter)
-
-total = sum(log_counter)
-print(f"Total number of Firestore reads: {total}")
-for i, counter in enumerate(log_counter):
-    print(f"Counter {i+1}: {counter}")
-## feedback
 ## number of users (plan)
 
 ## better UI
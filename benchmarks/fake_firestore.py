@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+# Time every fake document reports as its last update.
+UPDATE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _project(data, field_paths):
+    # Always returns a new dict, like the real client decoding a response.
+    if field_paths is None:
+        return dict(data)
+    projected = {}
+    for field_path in field_paths:
+        parts = FieldPath.from_api_repr(field_path).parts
+        source, target = data, projected
+        for part in parts[:-1]:
+            if part not in source:
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return projected
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = UPDATE_TIME
+        self._data = data
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class FakeDocument:
+    def __init__(self, client, collection, document_id):
+        self._client = client
+        self._collection = collection
+        self.id = document_id
+        self.path = f"{collection}/{document_id}"
+
+    def _snapshot(self, field_paths=None):
+        data = self._client.data.get(self._collection, {}).get(self.id)
+        return FakeSnapshot(self, None if data is None else _project(data, field_paths))
+
+    def get(self, field_paths=None):
+        self._client.rpc()
+        return self._snapshot(field_paths)
+
+    def update(self, update_data):
+        self._client.rpc()
+        self._client.data[self._collection][self.id].update(update_data)
+
+    def set(self, document_data, merge=False):
+        self._client.rpc()
+        documents = self._client.data.setdefault(self._collection, {})
+        if merge and self.id in documents:
+            documents[self.id].update(document_data)
+        else:
+            documents[self.id] = dict(document_data)
+
+
+class FakeQuery:
+    def __init__(self, client, collection, fields=None, limit=None):
+        self._client = client
+        self._collection = collection
+        self._fields = fields
+        self._limit = limit
+        self.id = collection
+
+    def document(self, document_id):
+        return FakeDocument(self._client, self._collection, document_id)
+
+    def select(self, field_paths):
+        return FakeQuery(self._client, self._collection, list(field_paths), self._limit)
+
+    def limit(self, count):
+        return FakeQuery(self._client, self._collection, self._fields, count)
+
+    def stream(self):
+        self._client.rpc()
+        documents = self._client.data.get(self._collection, {})
+        for index, (document_id, data) in enumerate(documents.items()):
+            if self._limit is not None and index >= self._limit:
+                return
+            yield FakeSnapshot(self.document(document_id), _project(data, self._fields))
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeFirestore:
+    # The subset of the Firestore client the loaders use. Each RPC sleeps for
+    # `latency` seconds and is counted in `rpcs`.
+
+    def __init__(self, data, latency=0.0):
+        self.data = data
+        self.latency = latency
+        self.rpcs = 0
+        self._lock = threading.Lock()
+
+    def rpc(self):
+        with self._lock:
+            self.rpcs += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def get_all(self, references, field_paths=None):
+        references = list(references)
+        self.rpc()
+        for reference in references:
+            yield reference._snapshot(field_paths)
@@ -0,0 +1,43 @@
+import random
+from datetime import datetime, timedelta
+
+from data_access import EXCLUDED_USERS, SEARCH_COUNTERS
+
+PLANS = ['Trial', 'Premium', 'No Plan']
+SEARCH_USAGE_SHARE = 0.7
+WORKSHEETS_SHARE = 0.5
+MAX_WORKSHEETS = 10
+MAX_PROMPTS = 5
+
+
+def generate(user_count, seed=0, now=datetime(2024, 6, 1)):
+    # Users, search-usage and worksheets documents keyed like Firestore:
+    # {collection: {document_id: data}}. The same seed gives the same data.
+    rng = random.Random(seed)
+    data = {'users': {}, 'search-usage': {}, 'worksheets': {}}
+
+    for index in range(user_count):
+        user_id = f"user{index:07d}"
+        display_name = EXCLUDED_USERS[index] if index < len(EXCLUDED_USERS) else f"User {index}"
+        user = {'displayName': display_name, 'current_plan': rng.choice(PLANS)}
+        if user['current_plan'] == 'Trial':
+            activated = now - timedelta(days=rng.randint(0, 30), seconds=rng.randint(0, 86399))
+            user['trial_activated_date'] = activated.strftime("%Y-%m-%dT%H:%M:%S.%f")
+        data['users'][user_id] = user
+
+        if rng.random() < SEARCH_USAGE_SHARE:
+            # Heavy-tailed: most users search a little, a few search a lot.
+            data['search-usage'][user_id] = {counter: int(rng.lognormvariate(1.5, 1.5)) for counter in SEARCH_COUNTERS}
+
+        if rng.random() < WORKSHEETS_SHARE:
+            data['worksheets'][user_id] = {
+                f"ws{worksheet:02d}": {
+                    'name': f"Worksheet {worksheet}",
+                    'numRows': rng.randint(1, 5000),
+                    'customResearchPrompts': {f"prompt{prompt}": "Find the company's latest funding round"
+                                              for prompt in range(rng.randint(0, MAX_PROMPTS))},
+                }
+                for worksheet in range(rng.randint(1, MAX_WORKSHEETS))
+            }
+
+    return data
@@ -0,0 +1,124 @@
+import argparse
+import json
+import logging
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fake_firestore import FakeFirestore
+from benchmarks.generate import generate
+from loaders import get_users
+from rollup import compute_rollup
+from snapshot import load_snapshot, overall_stats, overall_usage_stats
+from usage_chart import DEFAULT_TOP_N, build_top_users_figure, top_users
+from user_profile import load_user_profile
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+# Allowed slowdown or memory growth over the baseline before a run fails.
+DEFAULT_TOLERANCE = 0.25
+PROFILE_SAMPLE = 20
+
+
+def bench_overall_usage_bar_graph(db):
+    rollup = compute_rollup(load_snapshot(db))
+    build_top_users_figure(top_users(rollup["users_usage"], DEFAULT_TOP_N))
+
+
+def bench_user_profiles(db):
+    # PROFILE_SAMPLE profile loads per run, as when clicking through users.
+    user_ids = list(db.data['users'])[:PROFILE_SAMPLE]
+    for user_id in user_ids:
+        load_user_profile(db, user_id)
+
+
+# Uncached loader bodies, i.e. what a cache miss costs.
+BENCHMARKS = {
+    "get_users": lambda db: get_users.__wrapped__(db),
+    "get_overall_stats": lambda db: overall_stats(load_snapshot(db)),
+    "get_overall_usage_stats": lambda db: overall_usage_stats(load_snapshot(db)),
+    "overall_users_usage_bar_graph": bench_overall_usage_bar_graph,
+    "get_user_profile": bench_user_profiles,
+}
+
+
+def measure(func, db, repeat):
+    # RPCs from an untimed warm-up run (which also pays for lazy imports),
+    # best wall time over `repeat` runs, then peak memory from a separate
+    # traced run since tracemalloc slows everything down.
+    rpcs_before = db.rpcs
+    func(db)
+    rpcs = db.rpcs - rpcs_before
+
+    wall_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(db)
+        wall_times.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        func(db)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"wall_ms": min(wall_times), "rpcs": rpcs, "peak_mib": peak_bytes / 2 ** 20}
+
+
+def run(sizes, latency=0.0, repeat=DEFAULT_REPEAT, seed=0, names=None):
+    results = {}
+    for size in sizes:
+        db = FakeFirestore(generate(size, seed), latency=latency)
+        for name, func in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            result = measure(func, db, repeat)
+            results[f"{name}@{size}"] = result
+            print(f"{name:<34} {size:>7} users  {result['wall_ms']:>10.1f} ms  {result['rpcs']:>6} rpcs"
+                  f"  {result['peak_mib']:>8.1f} MiB", flush=True)
+    return results
+
+
+def regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    found = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if result["rpcs"] > previous["rpcs"]:
+            found.append(f"{key}: {result['rpcs']} rpcs, baseline {previous['rpcs']}")
+        for metric in ("wall_ms", "peak_mib"):
+            if result[metric] > previous[metric] * (1 + tolerance):
+                found.append(f"{key}: {metric} {result[metric]:.1f}, baseline {previous[metric]:.1f}")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard loaders against an in-memory Firestore fake.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="user counts to generate")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per RPC")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="benchmark names to run")
+    parser.add_argument("--baseline", help="JSON results to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run(args.sizes, args.latency_ms / 1000, args.repeat, args.seed, args.only)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
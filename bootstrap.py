@@ -0,0 +1,74 @@
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+
+from instrumentation import trace_client
+
+logger = logging.getLogger(__name__)
+
+_startup_lock = threading.Lock()
+_startup_timings = {}
+
+
+def record_startup(step, started):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _startup_lock:
+        _startup_timings.setdefault(step, elapsed_ms)
+    logger.info("startup: %s took %.1f ms", step, elapsed_ms)
+
+
+def startup_report():
+    with _startup_lock:
+        return dict(_startup_timings)
+
+
+class LazyModule:
+    # Defers importing a heavy module until one of its attributes is used.
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            record_startup(f"import {self._name}", started)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def create_client():
+    # Against the local emulator (FIRESTORE_EMULATOR_HOST) no credentials are
+    # needed; otherwise the service account comes from Streamlit secrets.
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore as cloud_firestore
+        return cloud_firestore.Client(project=os.environ.get("GCLOUD_PROJECT", "demo-dashboard"))
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        service_account_key = json.loads(st.secrets["firebase_service"])
+        firebase_admin.initialize_app(credentials.Certificate(service_account_key))
+    return firestore.client()
+
+
+@st.cache_resource
+def get_db():
+    # One client, and so one keepalive gRPC channel, per process instead of
+    # re-running the firebase_admin setup on every page script rerun.
+    started = time.perf_counter()
+    db = trace_client(create_client())
+    record_startup("firestore client", started)
+    return db
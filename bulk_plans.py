@@ -0,0 +1,78 @@
+import csv
+import io
+import re
+
+from data_access import PLANS, plan_update
+
+# Firestore's limit on writes per batch.
+BATCH_LIMIT = 500
+
+
+def parse_user_ids(text):
+    return [user_id for user_id in re.split(r"[\s,;]+", text) if user_id]
+
+
+def parse_csv(data):
+    # Rows of {"user_id", "plan"}; the plan column is optional and falls back
+    # to the plan picked in the form. Without a user_id header the first
+    # column is taken as the id.
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [column.strip().lower() for column in rows[0]]
+    if "user_id" in header:
+        id_column = header.index("user_id")
+        plan_column = header.index("plan") if "plan" in header else None
+        rows = rows[1:]
+    else:
+        id_column, plan_column = 0, None
+    return [
+        {"user_id": row[id_column].strip(), "plan": row[plan_column].strip() if plan_column is not None and len(row) > plan_column else None}
+        for row in rows
+        if len(row) > id_column and row[id_column].strip()
+    ]
+
+
+def validate(rows, users, default_plan):
+    # Splits rows into updates to apply and rejected rows with a reason.
+    plans = {plan.lower(): plan for plan in PLANS}
+    valid, rejected, seen = [], [], set()
+    for row in rows:
+        user_id = row["user_id"]
+        plan = plans.get((row.get("plan") or default_plan).lower())
+        if user_id not in users:
+            rejected.append({"user_id": user_id, "plan": row.get("plan") or default_plan, "status": "rejected", "error": "unknown user"})
+        elif plan is None:
+            rejected.append({"user_id": user_id, "plan": row["plan"], "status": "rejected", "error": "unknown plan"})
+        elif user_id in seen:
+            rejected.append({"user_id": user_id, "plan": plan, "status": "rejected", "error": "duplicate row"})
+        else:
+            seen.add(user_id)
+            valid.append({"user_id": user_id, "plan": plan})
+    return valid, rejected
+
+
+def apply_plan_updates(db, updates, activation_datetime, on_progress=None, chunk_size=BATCH_LIMIT):
+    # Commits the updates in batches of chunk_size. A batch is atomic, so
+    # if one fails its rows are retried one by one to find the bad ones.
+    users_ref = db.collection('users')
+    results = []
+    for start in range(0, len(updates), chunk_size):
+        chunk = updates[start:start + chunk_size]
+        batch = db.batch()
+        for update in chunk:
+            batch.update(users_ref.document(update["user_id"]), plan_update(update["plan"], activation_datetime))
+        try:
+            batch.commit()
+            results.extend({**update, "status": "updated", "error": ""} for update in chunk)
+        except Exception:
+            for update in chunk:
+                try:
+                    users_ref.document(update["user_id"]).update(plan_update(update["plan"], activation_datetime))
+                    results.append({**update, "status": "updated", "error": ""})
+                except Exception as e:
+                    results.append({**update, "status": "failed", "error": str(e)})
+        if on_progress:
+            on_progress(len(results), len(updates))
+    return results
@@ -0,0 +1,157 @@
+import datetime
+import io
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+import msgpack
+import pandas as pd
+import pyarrow as pa
+
+from snapshot_store import SNAPSHOT_DIR
+
+# "memory" keeps entries per process; "sqlite" shares them, and the
+# single-flight locks, between every process using CACHE_PATH.
+CACHE_BACKEND = os.environ.get("DASHBOARD_CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("DASHBOARD_CACHE_PATH", os.path.join(SNAPSHOT_DIR, "cache.sqlite"))
+
+_DATAFRAME_EXT = 1
+_DATETIME_EXT = 2
+
+
+def _encode(value):
+    if isinstance(value, pd.DataFrame):
+        table = pa.Table.from_pandas(value)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return msgpack.ExtType(_DATAFRAME_EXT, sink.getvalue())
+    if isinstance(value, datetime.datetime):
+        return msgpack.ExtType(_DATETIME_EXT, value.isoformat().encode())
+    raise TypeError(f"cannot serialize {type(value).__name__}")
+
+
+def _decode(code, data):
+    if code == _DATAFRAME_EXT:
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+    if code == _DATETIME_EXT:
+        return datetime.datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def serialize(value):
+    # msgpack, with DataFrames embedded as Arrow IPC streams.
+    return msgpack.packb(value, default=_encode, use_bin_type=True)
+
+
+def deserialize(payload):
+    return msgpack.unpackb(payload, ext_hook=_decode, raw=False, strict_map_key=False)
+
+
+class InProcessBackend:
+    # Entries and locks shared by the threads of one process.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._locks = {}
+
+    def get(self, key, newer_than=None):
+        # (value, refreshed_at), or None if missing or not newer.
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (newer_than is not None and entry[1] <= newer_than):
+            return None
+        return entry
+
+    def set(self, key, value, refreshed_at):
+        with self._lock:
+            self._entries[key] = (value, refreshed_at)
+
+    def acquire(self, key, ttl):
+        # Non-blocking; the lock expires after ttl seconds in case its
+        # holder dies.
+        now = time.time()
+        with self._lock:
+            if self._locks.get(key, 0) > now:
+                return False
+            self._locks[key] = now + ttl
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._locks.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+class SQLiteBackend:
+    # Entries and locks in one SQLite file shared by every process that
+    # opens it, e.g. replicas on one host or sharing a volume.
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, payload BLOB NOT NULL, refreshed_at REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key, newer_than=None):
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT payload, refreshed_at FROM entries WHERE key = ? AND refreshed_at > ?",
+                (key, -1 if newer_than is None else newer_than),
+            ).fetchone()
+        if row is None:
+            return None
+        return deserialize(row[0]), row[1]
+
+    def set(self, key, value, refreshed_at):
+        payload = serialize(value)
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO entries (key, payload, refreshed_at) VALUES (?, ?, ?)", (key, payload, refreshed_at))
+
+    def acquire(self, key, ttl):
+        # One upsert, so two processes cannot both take an expired lock.
+        now = time.time()
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO locks (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE locks.expires_at <= ?",
+                (key, self._owner, now + ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, self._owner))
+
+    def clear(self, prefix=""):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def default_backend():
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = SQLiteBackend() if CACHE_BACKEND == "sqlite" else InProcessBackend()
+        return _default_backend
@@ -0,0 +1,92 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fan_out import fan_out
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_USERS = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
+SEARCH_COUNTERS = ['personProfileSearches', 'customSearches', 'companyProfileSearches', 'linkedInSearches']
+
+# Number of document references sent per BatchGetDocuments call.
+GET_ALL_CHUNK_SIZE = 100
+
+
+def new_read_stats():
+    return {"round_trips": 0, "documents": 0}
+
+
+def log_read_stats(loader, stats):
+    logger.info("%s: %d round trips, %d documents", loader, stats["round_trips"], stats["documents"])
+
+
+def stream_users(db, stats, fields=None):
+    # A collection stream is a single streamed RPC regardless of its size.
+    users_ref = db.collection('users')
+    if fields is not None:
+        users_ref = users_ref.select(fields)
+    users = list(users_ref.stream())
+    stats["round_trips"] += 1
+    stats["documents"] += len(users)
+    return users
+
+
+def get_all_chunked(db, refs, stats, field_paths=None, chunk_size=GET_ALL_CHUNK_SIZE):
+    # Chunks are fetched concurrently through fan_out; each retry re-reads
+    # its whole chunk.
+    chunks = [refs[start:start + chunk_size] for start in range(0, len(refs), chunk_size)]
+    docs = {}
+    for chunk, chunk_docs in zip(chunks, fan_out(lambda chunk: list(db.get_all(chunk, field_paths=field_paths)), chunks)):
+        for doc in chunk_docs:
+            docs[doc.id] = doc
+        stats["round_trips"] += 1
+        stats["documents"] += len(chunk)
+    return docs
+
+
+def get_documents_for_users(db, collection_name, user_ids, stats, field_paths=None):
+    collection_ref = db.collection(collection_name)
+    refs = [collection_ref.document(user_id) for user_id in user_ids]
+    return get_all_chunked(db, refs, stats, field_paths)
+
+
+TRIAL_LENGTH_DAYS = 14
+PLANS = ["Trial", "Inactive", "Premium"]
+# How activation datetimes are written; ISO 8601 strings sort by time.
+ACTIVATION_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def parse_activation(value):
+    # Accepts the stored ISO strings with or without fractional seconds and
+    # with a trailing 'Z'; returns a naive datetime, or None if unparseable.
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value[:-1] if value.endswith('Z') else value)
+    except ValueError:
+        logger.warning("unparseable activation datetime %r", value)
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def trial_status(user_data, now=None):
+    plan = user_data.get('current_plan', 'No Plan')
+    trial_activation_date = parse_activation(user_data.get('trial_activated_date'))
+    days_left = 0
+
+    if trial_activation_date:
+        trial_end_date = trial_activation_date + timedelta(days=TRIAL_LENGTH_DAYS)
+        days_left = max((trial_end_date - (now or datetime.now())).days, 0)
+
+    return plan, days_left
+
+
+def plan_update(new_plan, activation_datetime):
+    update_data = {'current_plan': new_plan}
+    if new_plan.lower() == 'trial':
+        update_data['trial_activated_date'] = activation_datetime
+    elif new_plan.lower() == 'premium':
+        update_data['last_plan_upgrade_date'] = activation_datetime
+    return update_data
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import estimate_bytes
+
+# Budget for the estimated size of all cached entities. Estimates follow
+# Firestore's storage rules, so the process holds a few times this.
+ENTITY_CACHE_MAX_BYTES = int(float(os.environ.get("DASHBOARD_ENTITY_CACHE_MB", 64)) * 1024 * 1024)
+
+
+def entity_bytes(value):
+    # Dataclasses such as the profile bundle are sized by their fields.
+    if hasattr(value, "__dataclass_fields__"):
+        return sum(estimate_bytes(getattr(value, name)) for name in value.__dataclass_fields__)
+    return estimate_bytes(value)
+
+
+def _new_kind_stats():
+    return {"entries": 0, "bytes": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+
+class EntityCache:
+    # Process-wide cache keyed by (kind, entity id) so a write can patch or
+    # drop exactly the affected entity instead of clearing a whole loader.
+    # Entries expire after ttl seconds and the least recently used are
+    # evicted once their estimated size exceeds max_bytes.
+
+    def __init__(self, ttl=600, max_bytes=ENTITY_CACHE_MAX_BYTES, sizeof=entity_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        # key -> (value, loaded_at, size), least recently used first.
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {}
+
+    def _kind_stats(self, kind):
+        return self._stats.setdefault(kind, _new_kind_stats())
+
+    def _remove(self, key):
+        value, loaded_at, size = self._entries.pop(key)
+        self._bytes -= size
+        stats = self._kind_stats(key[0])
+        stats["entries"] -= 1
+        stats["bytes"] -= size
+
+    def _store(self, key, value, loaded_at):
+        # Must hold the lock. An entry larger than the whole budget is
+        # returned to the caller but not kept.
+        if key in self._entries:
+            self._remove(key)
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, loaded_at, size)
+        self._bytes += size
+        stats = self._kind_stats(key[0])
+        stats["entries"] += 1
+        stats["bytes"] += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._kind_stats(oldest[0])["evictions"] += 1
+
+    def get(self, kind, entity_id, load):
+        key = (kind, entity_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._kind_stats(kind)["hits"] += 1
+                    return entry[0]
+                self._remove(key)
+            self._kind_stats(kind)["misses"] += 1
+        value = load()
+        with self._lock:
+            self._store(key, value, time.monotonic())
+        return value
+
+    def patch(self, kind, entity_id, update):
+        with self._lock:
+            entry = self._entries.get((kind, entity_id))
+            if entry is not None:
+                self._store((kind, entity_id), update(entry[0]), entry[1])
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        # Per-kind entries, estimated bytes, hits, misses and evictions.
+        with self._lock:
+            return {kind: dict(stats) for kind, stats in self._stats.items()}
+
+    def total_bytes(self):
+        with self._lock:
+            return self._bytes
@@ -0,0 +1,86 @@
+import argparse
+import logging
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from data_access import EXCLUDED_USERS, SEARCH_COUNTERS, get_documents_for_users, log_read_stats, new_read_stats
+
+logger = logging.getLogger(__name__)
+
+# Users read, joined and written per step; memory use is bounded by this.
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = ["csv", "parquet"]
+
+USAGE_SCHEMA = pa.schema(
+    [("user_id", pa.string()), ("displayName", pa.string())]
+    + [(counter, pa.int64()) for counter in SEARCH_COUNTERS]
+    + [("total_searches", pa.int64())]
+)
+
+
+def iter_usage_batches(db, chunk_size=EXPORT_CHUNK_SIZE, stats=None):
+    # Pages through users by document id and joins each page with its
+    # search-usage documents, yielding one record batch per page. Excluded
+    # users are skipped; users without search-usage get zero counters.
+    stats = stats if stats is not None else new_read_stats()
+    users_query = db.collection('users').select(['displayName']).order_by(FieldPath.document_id()).limit(chunk_size)
+    cursor = None
+    while True:
+        query = users_query if cursor is None else users_query.start_after(cursor)
+        users = list(query.stream())
+        stats["round_trips"] += 1
+        stats["documents"] += len(users)
+        if not users:
+            return
+        cursor = users[-1]
+
+        names = {user.id: user.to_dict().get('displayName', 'No Name') for user in users}
+        user_ids = [user_id for user_id, name in names.items() if name not in EXCLUDED_USERS]
+        search_usage = get_documents_for_users(db, 'search-usage', user_ids, stats, SEARCH_COUNTERS)
+
+        columns = {"user_id": user_ids, "displayName": [names[user_id] for user_id in user_ids]}
+        for counter in SEARCH_COUNTERS:
+            columns[counter] = [
+                int((search_usage[user_id].to_dict() or {}).get(counter, 0) or 0) if user_id in search_usage else 0
+                for user_id in user_ids
+            ]
+        columns["total_searches"] = [sum(counts) for counts in zip(*(columns[counter] for counter in SEARCH_COUNTERS))]
+        yield pa.RecordBatch.from_pydict(columns, schema=USAGE_SCHEMA)
+
+        if len(users) < chunk_size:
+            return
+
+
+def write_usage_export(db, sink, export_format="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    # Streams the export into `sink` (a path or binary file object) and
+    # returns the number of rows written.
+    stats = new_read_stats()
+    writer_class = pq.ParquetWriter if export_format == "parquet" else pa_csv.CSVWriter
+    rows = 0
+    with writer_class(sink, USAGE_SCHEMA) as writer:
+        for batch in iter_usage_batches(db, chunk_size, stats):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    log_read_stats("export", stats)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the per-user search usage table.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", required=True, help="file to write")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="users read per step")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from bootstrap import create_client
+
+    rows = write_usage_export(create_client(), args.output, args.format, args.chunk_size)
+    print(f"wrote {rows} users to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core import exceptions
+from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from instrumentation import bind_context
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests per fan-out; lower it to stay under Firestore quotas.
+FANOUT_MAX_WORKERS = int(os.environ.get("DASHBOARD_FANOUT_WORKERS", 8))
+FANOUT_MAX_ATTEMPTS = int(os.environ.get("DASHBOARD_FANOUT_ATTEMPTS", 5))
+FANOUT_MAX_BACKOFF = float(os.environ.get("DASHBOARD_FANOUT_MAX_BACKOFF", 10))
+
+# Errors Firestore documents as safe to retry.
+RETRYABLE_ERRORS = (
+    exceptions.Aborted,
+    exceptions.DeadlineExceeded,
+    exceptions.InternalServerError,
+    exceptions.ResourceExhausted,
+    exceptions.ServiceUnavailable,
+)
+
+
+def with_retry(func, max_attempts=FANOUT_MAX_ATTEMPTS, max_backoff=FANOUT_MAX_BACKOFF):
+    return retry(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        wait=wait_random_exponential(multiplier=0.5, max=max_backoff),
+        stop=stop_after_attempt(max_attempts),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True,
+    )(func)
+
+
+def fan_out(func, items, max_workers=FANOUT_MAX_WORKERS, max_attempts=FANOUT_MAX_ATTEMPTS):
+    # Yields func(item) for each item in input order. At most max_workers
+    # calls run at once and at most 2 x max_workers results wait on the
+    # consumer, so a slow consumer also slows down the requests.
+    items = list(items)
+    call = with_retry(func, max_attempts)
+    if max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield call(item)
+        return
+
+    call = bind_context(call)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fan-out") as executor:
+        try:
+            for item in items:
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(call, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
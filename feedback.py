@@ -0,0 +1,236 @@
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+import streamlit as st
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from instrumentation import tracked
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_COLLECTION = 'v4-feedback'
+# Documents per cursor page while syncing.
+FEEDBACK_SYNC_PAGE_SIZE = 500
+FEEDBACK_SYNC_INTERVAL = 60
+# Full walks by document id notice deleted documents and ones missing the
+# creation field; they run at most this often.
+FEEDBACK_FULL_SYNC_INTERVAL = 3600
+FEEDBACK_RESULTS_PAGE_SIZE = 20
+# The feedback documents' creation timestamp field. Between full walks only
+# documents created after the newest one seen are read. Set it to an empty
+# string to make every sync a full walk.
+FEEDBACK_CREATED_AT_FIELD = os.environ.get("DASHBOARD_FEEDBACK_CREATED_AT_FIELD", "createdAt") or None
+# Short scalar fields are also indexed as `field:value` filter tokens.
+MAX_FILTER_VALUE_LENGTH = 64
+
+_TOKEN_PATTERN = re.compile(r"[\w']+")
+
+
+def tokenize(text):
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def document_tokens(data):
+    tokens = set()
+    for field, value in data.items():
+        if isinstance(value, str):
+            tokens.update(tokenize(value))
+        if isinstance(value, (str, int, float, bool)) and len(str(value)) <= MAX_FILTER_VALUE_LENGTH:
+            tokens.add(f"{field.lower()}:{str(value).lower()}")
+    return tokens
+
+
+class FeedbackIndex:
+    # Feedback documents plus an inverted index from token to document ids,
+    # updated page by page as the collection is synced.
+
+    def __init__(self, created_at_field=FEEDBACK_CREATED_AT_FIELD, page_size=FEEDBACK_SYNC_PAGE_SIZE, full_sync_interval=FEEDBACK_FULL_SYNC_INTERVAL):
+        self.created_at_field = created_at_field
+        self.page_size = page_size
+        self.full_sync_interval = full_sync_interval
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._documents = {}
+        self._postings = {}
+        self._vocabulary = []
+        # Newest creation time seen, as a {field: value} cursor.
+        self._cursor = None
+        self._synced_at = None
+        self._full_synced_at = None
+        self._refreshing = False
+        self._warned_no_created_at = False
+
+    def _add(self, document_id, data):
+        # Called with the lock held; replaces any earlier version.
+        previous = self._documents.get(document_id)
+        if previous == data:
+            return False
+        if previous is not None:
+            for token in document_tokens(previous):
+                self._postings[token].discard(document_id)
+        self._documents[document_id] = data
+        for token in document_tokens(data):
+            if token not in self._postings:
+                bisect.insort(self._vocabulary, token)
+                self._postings[token] = set()
+            self._postings[token].add(document_id)
+        return True
+
+    def _remove(self, document_id):
+        # Called with the lock held.
+        for token in document_tokens(self._documents.pop(document_id)):
+            self._postings[token].discard(document_id)
+
+    def _query(self, db, order_field, cursor):
+        query = db.collection(FEEDBACK_COLLECTION).order_by(order_field or FieldPath.document_id())
+        if cursor is not None:
+            query = query.start_after(cursor)
+        return query.limit(self.page_size)
+
+    def _needs_full_walk(self):
+        return (
+            not self.created_at_field
+            or self._cursor is None
+            or self._full_synced_at is None
+            or time.time() - self._full_synced_at > self.full_sync_interval
+        )
+
+    def sync(self, db, full=None, if_empty=False):
+        # Returns the number of new, changed or deleted documents. A full
+        # walk re-reads the collection by document id (auto ids are random,
+        # so new ones can sort anywhere); otherwise only documents created
+        # after the cursor are read. With if_empty, callers that waited on
+        # another caller's first sync return without syncing again.
+        with self._sync_lock:
+            if if_empty and self._synced_at is not None:
+                return 0
+            if full is None:
+                full = self._needs_full_walk()
+            full = full or not self.created_at_field
+            order_field = None if full else self.created_at_field
+            newest = self._cursor[self.created_at_field] if self._cursor else None
+            cursor = None if full else self._cursor
+            changed = 0
+            seen = set()
+            while True:
+                docs = list(self._query(db, order_field, cursor).stream())
+                with self._lock:
+                    for doc in docs:
+                        data = doc.to_dict()
+                        seen.add(doc.id)
+                        changed += self._add(doc.id, data)
+                        created_at = data.get(self.created_at_field) if self.created_at_field else None
+                        if created_at is not None and (newest is None or created_at > newest):
+                            newest = created_at
+                if docs:
+                    cursor = docs[-1]
+                if len(docs) < self.page_size:
+                    break
+            with self._lock:
+                now = time.time()
+                if full:
+                    for document_id in set(self._documents) - seen:
+                        self._remove(document_id)
+                        changed += 1
+                    self._full_synced_at = now
+                    if self.created_at_field and seen and newest is None and not self._warned_no_created_at:
+                        self._warned_no_created_at = True
+                        logger.warning(
+                            "feedback index: no document has %r; every sync will walk the whole collection. "
+                            "Set DASHBOARD_FEEDBACK_CREATED_AT_FIELD to the creation timestamp field.",
+                            self.created_at_field,
+                        )
+                if newest is not None:
+                    self._cursor = {self.created_at_field: newest}
+                self._synced_at = now
+            return changed
+
+    def refresh_in_background(self, db):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        thread = threading.Thread(target=self._sync_quietly, args=(db,), name="feedback-sync", daemon=True)
+        thread.start()
+
+    def _sync_quietly(self, db):
+        try:
+            with tracked("feedback"):
+                self.sync(db)
+        except Exception:
+            logger.exception("feedback index: background sync failed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def synced_at(self):
+        with self._lock:
+            return self._synced_at
+
+    def is_stale(self, interval=FEEDBACK_SYNC_INTERVAL):
+        return self._synced_at is None or time.time() - self._synced_at > interval
+
+    def _matching(self, term):
+        # Ids of documents with a token that starts with `term`.
+        position = bisect.bisect_left(self._vocabulary, term)
+        ids = set()
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            ids |= self._postings[self._vocabulary[position]]
+            position += 1
+        return ids
+
+    def search(self, query=""):
+        # All terms must match, each as a token prefix; `field:value` terms
+        # filter on short fields. An empty query returns every document.
+        # Results come newest first when a creation field is configured,
+        # followed by documents without one.
+        terms = []
+        for term in query.lower().split():
+            terms.extend([term] if ":" in term else tokenize(term))
+        with self._lock:
+            if terms:
+                ids = None
+                for term in terms:
+                    term_ids = self._matching(term)
+                    ids = term_ids if ids is None else ids & term_ids
+                    if not ids:
+                        return []
+            else:
+                ids = set(self._documents)
+            if self.created_at_field:
+                dated = [document_id for document_id in ids if self._documents[document_id].get(self.created_at_field) is not None]
+                undated = sorted(ids.difference(dated))
+                return sorted(dated, key=lambda document_id: self._documents[document_id][self.created_at_field], reverse=True) + undated
+            return sorted(ids)
+
+    def documents(self, document_ids):
+        with self._lock:
+            return [(document_id, self._documents[document_id]) for document_id in document_ids]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._documents)
+
+
+def render_feedback_page(index, query, page_size=FEEDBACK_RESULTS_PAGE_SIZE):
+    # Only the current page's documents are looked up and rendered.
+    result_ids = index.search(query)
+    st.caption(f"{len(result_ids)} of {len(index)} feedback entries")
+    if not result_ids:
+        st.write("No feedback found.")
+        return
+
+    page_count = math.ceil(len(result_ids) / page_size)
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key="feedback_page")
+
+    for document_id, data in index.documents(result_ids[(page - 1) * page_size:page * page_size]):
+        with st.container(border=True):
+            st.caption(document_id)
+            st.json(data)
@@ -1,12 +1,12 @@
 import streamlit as st
 
-from pages import overall_stats, personal_stats
+st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
 
+st.title("Welcome to dotflo internal dashboard!")
 
-st.sidebar.title("Navigation")
-selection = st.sidebar.radio("Go to", list(PAGES.keys()))
-
-page = PAGES[selection]
-page.app()
-
-st.title("Welcome to dotflo internal dashboard!")
\ No newline at end of file
+st.page_link("pages/1_Overall-Stats.py", label="Overall Stats")
+st.page_link("pages/2_Personal-Stats.py", label="Personal Stats")
+st.page_link("pages/3_Admin.py", label="Admin")
+st.page_link("pages/4_Feedback.py", label="Feedback")
+st.page_link("pages/5_Bulk-Plans.py", label="Bulk Plans")
+st.page_link("pages/6_Trials.py", label="Trials")
@@ -0,0 +1,345 @@
+import contextlib
+import datetime
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+# Set to a file path to append one JSON line per finished rerun.
+METRICS_LOG_PATH = os.environ.get("DASHBOARD_METRICS_LOG")
+RECENT_RERUNS = 50
+
+_lock = threading.Lock()
+_loader_totals = {}
+_collection_totals = {}
+_recent_reruns = deque(maxlen=RECENT_RERUNS)
+_local = threading.local()
+
+# Methods that return another reference, query or aggregation to keep tracing.
+_CHAINED_METHODS = frozenset([
+    "collection", "collection_group", "document", "select", "where", "order_by", "limit", "limit_to_last",
+    "offset", "start_at", "start_after", "end_at", "end_before", "count", "sum", "avg",
+])
+
+
+def _new_stats():
+    return {"calls": 0, "hits": 0, "misses": 0, "rpcs": 0, "documents": 0, "bytes": 0, "wall_ms": 0.0}
+
+
+def estimate_bytes(value):
+    # Approximates Firestore's storage size rules for a decoded value.
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime.datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key).encode("utf-8")) + 1 + estimate_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_bytes(item) for item in value)
+    path = getattr(value, "path", None)
+    if isinstance(path, str):
+        return len(path.encode("utf-8")) + 1
+    return 16
+
+
+def document_bytes(snapshot):
+    # Reads the decoded fields directly to avoid to_dict()'s deep copy.
+    data = getattr(snapshot, "_data", None)
+    if data is None and hasattr(snapshot, "to_dict"):
+        data = snapshot.to_dict()
+    return len(snapshot.id) + 1 + estimate_bytes(data or {})
+
+
+def _frames():
+    if not hasattr(_local, "frames"):
+        _local.frames = []
+    return _local.frames
+
+
+def _current_loader():
+    frames = _frames()
+    return frames[-1]["name"] if frames else "unattributed"
+
+
+def _add(name, **deltas):
+    with _lock:
+        stats = _loader_totals.setdefault(name, _new_stats())
+        for key, delta in deltas.items():
+            stats[key] += delta
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        with _lock:
+            stats = rerun["loaders"].setdefault(name, _new_stats())
+            for key, delta in deltas.items():
+                stats[key] += delta
+
+
+def record_rpc(loader=None):
+    _add(loader or _current_loader(), rpcs=1)
+
+
+def _collection_of(snapshot):
+    path = getattr(getattr(snapshot, "reference", None), "path", "")
+    parts = path.split("/")
+    return parts[-2] if len(parts) >= 2 else "unknown"
+
+
+def record_documents(snapshots, loader=None):
+    loader = loader or _current_loader()
+    sizes = [document_bytes(snapshot) for snapshot in snapshots]
+    _add(loader, documents=len(snapshots), bytes=sum(sizes))
+    with _lock:
+        for snapshot, size in zip(snapshots, sizes):
+            stats = _collection_totals.setdefault((loader, _collection_of(snapshot)), {"documents": 0, "bytes": 0})
+            stats["documents"] += 1
+            stats["bytes"] += size
+
+
+def _record_result(result, loader=None):
+    if isinstance(result, list):
+        snapshots = [item for item in result if hasattr(item, "exists")]
+        # Aggregation results are billed as one read per result set.
+        _add(loader or _current_loader(), documents=len(result) - len(snapshots))
+        record_documents(snapshots, loader)
+    elif hasattr(result, "exists"):
+        record_documents([result], loader)
+
+
+def _unwrap(value):
+    return value._target if isinstance(value, TracedFirestore) else value
+
+
+class TracedFirestore:
+    # Transparent proxy over the Firestore client and the references and
+    # queries it hands out, recording RPCs, documents and bytes read.
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        if name in _CHAINED_METHODS:
+            return lambda *args, **kwargs: TracedFirestore(attr(*args, **kwargs))
+        if name == "get":
+            return lambda *args, **kwargs: self._traced_get(attr, *args, **kwargs)
+        if name == "stream":
+            return lambda *args, **kwargs: self._traced_stream(attr(*args, **kwargs))
+        if name == "get_all":
+            return lambda references, *args, **kwargs: self._traced_stream(
+                attr([_unwrap(reference) for reference in references], *args, **kwargs))
+        if name == "on_snapshot":
+            return lambda callback: attr(self._traced_callback(callback))
+        return attr
+
+    def _traced_get(self, method, *args, **kwargs):
+        record_rpc()
+        result = method(*args, **kwargs)
+        _record_result(result)
+        return result
+
+    def _traced_stream(self, iterator):
+        record_rpc()
+        for item in iterator:
+            _record_result(item)
+            yield item
+
+    def _traced_callback(self, callback):
+        loader = f"on_snapshot:{getattr(self._target, 'id', 'query')}"
+
+        def traced(col_snapshot, changes, read_time):
+            record_rpc(loader)
+            record_documents([change.document for change in changes], loader)
+            return callback(col_snapshot, changes, read_time)
+
+        return traced
+
+    def __repr__(self):
+        return f"TracedFirestore({self._target!r})"
+
+
+def trace_client(db):
+    return TracedFirestore(db)
+
+
+def mark_miss():
+    frames = _frames()
+    if frames:
+        frames[-1]["miss"] = True
+
+
+@contextlib.contextmanager
+def tracked(name):
+    # Records a call, whether it missed its cache (see mark_miss) and wall
+    # time, attributing any reads made inside to this loader.
+    frame = {"name": name, "miss": False}
+    _frames().append(frame)
+    start = time.perf_counter()
+    try:
+        yield frame
+    finally:
+        _frames().pop()
+        _add(name, calls=1, hits=int(not frame["miss"]), misses=int(frame["miss"]),
+             wall_ms=(time.perf_counter() - start) * 1000)
+
+
+def bind_context(func, rerun=True):
+    # Lets worker threads attribute their reads to the calling loader and,
+    # unless the work outlives it, the calling rerun; both are otherwise
+    # thread-local.
+    loader = _current_loader()
+    rerun = getattr(_local, "rerun", None) if rerun else None
+
+    @functools.wraps(func)
+    def bound(*args, **kwargs):
+        _local.frames = [{"name": loader, "miss": False}]
+        _local.rerun = rerun
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.frames = []
+            _local.rerun = None
+
+    return bound
+
+
+def cached_loader(name, cache=None, **cache_kwargs):
+    # Caches the loader (st.cache_data by default) and tracks it.
+    cache = cache or st.cache_data
+
+    def decorator(func):
+        def compute(*args, **kwargs):
+            mark_miss()
+            return func(*args, **kwargs)
+
+        cached = cache(**cache_kwargs)(functools.wraps(func)(compute))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracked(name):
+                return cached(*args, **kwargs)
+
+        wrapper.clear = cached.clear
+        if hasattr(cached, "last_refreshed"):
+            wrapper.last_refreshed = cached.last_refreshed
+        return wrapper
+
+    return decorator
+
+
+def start_rerun(page):
+    _local.rerun = {
+        "page": page,
+        "started_at": datetime.datetime.now().isoformat(),
+        "start": time.perf_counter(),
+        "loaders": {},
+    }
+
+
+def fragment(page, name):
+    # st.fragment that shows up in the metrics: as fragment:<name> inside a
+    # full rerun, and as its own rerun record when it reruns alone.
+    def decorator(func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if getattr(_local, "rerun", None) is not None:
+                with tracked(f"fragment:{name}"):
+                    return func(*args, **kwargs)
+            start_rerun(f"{page}: {name}")
+            _local.fragment_rerun = True
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.fragment_rerun = False
+                finish_rerun()
+
+        return st.fragment(timed)
+
+    return decorator
+
+
+def is_fragment_rerun():
+    return getattr(_local, "fragment_rerun", False)
+
+
+def finish_rerun():
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+
+    record = {
+        "page": rerun["page"],
+        "started_at": rerun["started_at"],
+        "wall_ms": (time.perf_counter() - rerun["start"]) * 1000,
+        "loaders": rerun["loaders"],
+    }
+    with _lock:
+        _recent_reruns.append(record)
+    if METRICS_LOG_PATH:
+        export_jsonl(record, METRICS_LOG_PATH)
+    return record
+
+
+def export_jsonl(record, path):
+    with _lock:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def loader_metrics():
+    with _lock:
+        return {name: dict(stats) for name, stats in _loader_totals.items()}
+
+
+def collection_metrics():
+    with _lock:
+        return {key: dict(stats) for key, stats in _collection_totals.items()}
+
+
+def recent_reruns():
+    with _lock:
+        return list(_recent_reruns)
+
+
+def rerun_latency(records):
+    # Wall time per rerun name, e.g. "Personal Stats" for full reruns and
+    # "Personal Stats: plan editor" for that fragment rerunning alone.
+    by_page = {}
+    for record in records:
+        by_page.setdefault(record["page"], []).append(record["wall_ms"])
+    summary = {}
+    for page, wall_times in sorted(by_page.items()):
+        wall_times.sort()
+        summary[page] = {
+            "reruns": len(wall_times),
+            "median_ms": statistics.median(wall_times),
+            "p95_ms": wall_times[min(len(wall_times) - 1, int(len(wall_times) * 0.95))],
+        }
+    return summary
+
+
+def reset_metrics():
+    with _lock:
+        _loader_totals.clear()
+        _collection_totals.clear()
+        _recent_reruns.clear()
+
+
+if __name__ == "__main__":
+    # Summarizes a DASHBOARD_METRICS_LOG file: python -m instrumentation metrics.jsonl
+    with open(sys.argv[1]) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for page, stats in rerun_latency(records).items():
+        print(f"{page:<45} {stats['reruns']:>6} reruns {stats['median_ms']:>9.1f} ms median {stats['p95_ms']:>9.1f} ms p95")
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from data_access import EXCLUDED_USERS, SEARCH_COUNTERS
+
+
+class LiveAggregates:
+    # Keeps the overall usage totals current by applying on_snapshot document
+    # changes as deltas instead of rescanning users and search-usage.
+
+    def __init__(self, db):
+        self._lock = threading.Lock()
+        self._names = {}
+        self._counters = {}
+        self._totals = dict.fromkeys(SEARCH_COUNTERS, 0)
+        self._total_users = 0
+        self._users_ready = threading.Event()
+        self._search_usage_ready = threading.Event()
+        self._watches = [
+            db.collection('users').on_snapshot(self._on_users_snapshot),
+            db.collection('search-usage').on_snapshot(self._on_search_usage_snapshot),
+        ]
+
+    def _is_included(self, user_id):
+        return user_id in self._names and self._names[user_id] not in EXCLUDED_USERS
+
+    def _apply(self, user_id, update):
+        # Remove the user's old contribution, apply the change, add the new one.
+        with self._lock:
+            was_included = self._is_included(user_id)
+            old_counters = self._counters.get(user_id) if was_included else None
+            update()
+            is_included = self._is_included(user_id)
+            new_counters = self._counters.get(user_id) if is_included else None
+
+            self._total_users += int(is_included) - int(was_included)
+            for counter in SEARCH_COUNTERS:
+                if old_counters:
+                    self._totals[counter] -= old_counters[counter]
+                if new_counters:
+                    self._totals[counter] += new_counters[counter]
+
+    def _on_users_snapshot(self, col_snapshot, changes, read_time):
+        for change in changes:
+            doc = change.document
+            if change.type.name == 'REMOVED':
+                self._apply(doc.id, lambda: self._names.pop(doc.id, None))
+            else:
+                display_name = doc.to_dict().get('displayName', '')
+                self._apply(doc.id, lambda: self._names.__setitem__(doc.id, display_name))
+        self._users_ready.set()
+
+    def _on_search_usage_snapshot(self, col_snapshot, changes, read_time):
+        for change in changes:
+            doc = change.document
+            if change.type.name == 'REMOVED':
+                self._apply(doc.id, lambda: self._counters.pop(doc.id, None))
+            else:
+                search_stats = doc.to_dict()
+                counters = {counter: int(search_stats.get(counter, 0) or 0) for counter in SEARCH_COUNTERS}
+                self._apply(doc.id, lambda: self._counters.__setitem__(doc.id, counters))
+        self._search_usage_ready.set()
+
+    def wait_ready(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._users_ready.wait(timeout):
+            return False
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        return self._search_usage_ready.wait(remaining)
+
+    def usage_stats(self):
+        with self._lock:
+            totals = dict(self._totals)
+            total_users = self._total_users
+        return {
+            "total_users": total_users,
+            "total_searches": sum(totals.values()),
+            "total_profile_enrichments": totals['personProfileSearches'],
+            "total_custom_research_prompts": totals['customSearches'],
+            "total_company_profiles": totals['companyProfileSearches'],
+            "total_linkedin_profiles": totals['linkedInSearches']
+        }
+
+    def close(self):
+        for watch in self._watches:
+            watch.unsubscribe()
+
+
+if __name__ == "__main__":
+    # Run against the local emulator with FIRESTORE_EMULATOR_HOST set, then
+    # write to users/search-usage and watch the totals follow.
+    from bootstrap import create_client
+
+    aggregates = LiveAggregates(create_client())
+    aggregates.wait_ready()
+    try:
+        while True:
+            print(aggregates.usage_stats(), flush=True)
+            time.sleep(5)
+    finally:
+        aggregates.close()
@@ -0,0 +1,190 @@
+import streamlit as st
+
+from aggregations import AGGREGATION_BACKEND, server_usage_stats
+from bulk_plans import apply_plan_updates
+from data_access import plan_update
+from entity_cache import EntityCache
+from feedback import FeedbackIndex
+from instrumentation import cached_loader, mark_miss, tracked
+from live_aggregates import LiveAggregates
+from rollup import compute_rollup, load_rollup
+from schema import fields_for, sample_document_bytes
+from snapshot import overall_usage_stats
+from snapshot_store import SnapshotStore
+from swr_cache import swr_cache
+from trials import load_active_trials
+from usage_history import HistoryRecorder, UsageHistory, load_usage_counters
+from user_picker import UserSearchIndex
+from user_profile import load_user_profile
+from worksheets import load_worksheet_prompts
+
+# How long a rerun waits for the listeners' initial snapshot. Until they are
+# ready the server-side aggregates are served instead.
+LIVE_AGGREGATES_READY_TIMEOUT = 1
+
+
+@cached_loader("get_users", cache=swr_cache, ttl=600)
+def get_users(_db):
+    users = _db.collection('users').select(fields_for("get_users", "users")).stream()
+    return {user.id: user.to_dict().get('displayName', 'No Name') for user in users}
+
+
+@cached_loader("user_search_index", cache=st.cache_resource, ttl=600)
+def get_user_search_index(_db):
+    # Built once from the user map and shared, not copied, across sessions.
+    return UserSearchIndex(get_users(_db))
+
+
+@cached_loader("active_trials", ttl=300)
+def get_active_trials(_db):
+    return load_active_trials(_db)
+
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore()
+
+
+def get_snapshot(db):
+    return get_snapshot_store().frame(db)
+
+
+@st.cache_resource
+def get_live_aggregates(_db):
+    return LiveAggregates(_db)
+
+
+@cached_loader("rollup", cache=swr_cache, ttl=60)
+def get_rollup(_db):
+    return load_rollup(_db)
+
+
+def get_overall_rollup(db):
+    # Precomputed by `python rollup.py`; until the job has run once the page
+    # falls back to the snapshot.
+    rollup = get_rollup(db)
+    if rollup is None:
+        rollup = compute_rollup(get_snapshot(db))
+        rollup["version"] = str(get_snapshot_store().synced_at())
+    return rollup
+
+
+def get_live_usage_stats(db):
+    aggregates = get_live_aggregates(db)
+    if aggregates.wait_ready(LIVE_AGGREGATES_READY_TIMEOUT):
+        return aggregates.usage_stats()
+    return get_usage_stats(db, backend="server")
+
+
+@cached_loader("server_usage_stats", cache=swr_cache, ttl=60)
+def get_server_usage_stats(_db):
+    return server_usage_stats(_db)
+
+
+def get_usage_stats(db, backend=AGGREGATION_BACKEND):
+    if backend == "live":
+        return get_live_usage_stats(db)
+    if backend == "server":
+        stats = get_server_usage_stats(db)
+        if stats is not None:
+            return stats
+    return overall_usage_stats(get_snapshot(db))
+
+
+def usage_stats_refreshed_at(db, backend=AGGREGATION_BACKEND):
+    # When the totals get_usage_stats serves were loaded; None for the live
+    # listeners once they are ready, as they are always current.
+    if backend == "live":
+        if get_live_aggregates(db).wait_ready(0):
+            return None
+        backend = "server"
+    if backend == "server" and get_server_usage_stats(db) is not None:
+        return get_server_usage_stats.last_refreshed(db)
+    return get_snapshot_store().synced_at()
+
+
+@st.cache_resource
+def get_usage_history(_db):
+    # One store and one background sampler per process.
+    history = UsageHistory()
+
+    def sample():
+        with tracked("usage_history"):
+            return load_usage_counters(_db)
+
+    HistoryRecorder(history, sample)
+    return history
+
+
+@cached_loader("usage_trend", ttl=300)
+def get_usage_trend(_db, resolution, since=None):
+    return get_usage_history(_db).trend(resolution, since=since)
+
+
+@st.cache_resource
+def get_entity_cache():
+    return EntityCache(ttl=600)
+
+
+def cached_entity(kind, entity_id, load):
+    def compute():
+        mark_miss()
+        return load()
+
+    with tracked(kind):
+        return get_entity_cache().get(kind, entity_id, compute)
+
+
+def get_user_profile(db, user_id):
+    return cached_entity("profile", user_id, lambda: load_user_profile(db, user_id))
+
+
+def get_worksheet_prompts(db, user_id, worksheet_id):
+    return cached_entity("worksheet_prompts", (user_id, worksheet_id), lambda: load_worksheet_prompts(db, user_id, worksheet_id))
+
+
+def write_user_plan(db, user_id, update_data):
+    # Writes always go to Firestore; the cached profile is then patched so
+    # plan and trial days read back correctly on the next rerun, and the
+    # active trials are reloaded. The user list only holds display names,
+    # which a plan write never changes.
+    db.collection('users').document(user_id).update(update_data)
+    get_entity_cache().patch("profile", user_id, lambda profile: profile.with_user_update(update_data))
+    get_active_trials.clear()
+
+
+def write_user_plans(db, updates, activation_datetime, on_progress=None):
+    # Bulk version of write_user_plan; cached profiles are patched and the
+    # active trials cleared in one pass once every batch has been committed.
+    results = apply_plan_updates(db, updates, activation_datetime, on_progress)
+    entity_cache = get_entity_cache()
+    for result in results:
+        if result["status"] == "updated":
+            update_data = plan_update(result["plan"], activation_datetime)
+            entity_cache.patch("profile", result["user_id"], lambda profile: profile.with_user_update(update_data))
+    get_active_trials.clear()
+    return results
+
+
+@st.cache_resource(ttl=3600)
+def get_full_document_bytes(_db, collection):
+    with tracked("schema_sample"):
+        return sample_document_bytes(_db, collection)
+
+
+@st.cache_resource
+def get_feedback_index():
+    return FeedbackIndex()
+
+
+def get_feedback(db):
+    # The index lives for the process. Only the first call syncs inline;
+    # after that a stale index is served while it syncs in the background.
+    index = get_feedback_index()
+    with tracked("feedback"):
+        if index.synced_at() is None:
+            mark_miss()
+            index.sync(db, if_empty=True)
+        elif index.is_stale():
+            index.refresh_in_background(db)
+    return index
@@ -1,125 +1,59 @@
-import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json  
-from dateutil.parser import parse
-from datetime import timedelta, datetime
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import plotly.express as px
+import tempfile
 
-st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+import streamlit as st
 
-service_account_key_path = json.loads(st.secrets["firebase_service"])
-try:
-    firebase_admin.get_app()
-except ValueError as e:
-    cred = credentials.Certificate(service_account_key_path)
-    firebase_admin.initialize_app(cred)
+from bootstrap import get_db
+from export import EXPORT_FORMATS, write_usage_export
+from instrumentation import finish_rerun, start_rerun, tracked
+from loaders import get_overall_rollup, get_usage_stats, get_usage_trend, usage_stats_refreshed_at
+from swr_cache import format_age
+from usage_history import RESOLUTIONS
+from usage_chart import render_usage_chart
 
-db = firestore.client()
+st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+start_rerun("Overall Stats")
 
-users_ref = db.collection('users')
-search_stats_ref = db.collection('search-usage')
+db = get_db()
 
 
-@st.cache_data(ttl=600)
 def overall_users_usage_bar_graph():
-    global users_ref
-    users = users_ref.stream()
-    excluded_users = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
-
-    data = []
-
-    for user in users:
-        user_data = user.to_dict()
-        if user_data.get('displayName') in excluded_users:
-            continue
-        search_stats_ref = db.collection('search-usage').document(user.id)
-        search_stats_doc = search_stats_ref.get()
-        if search_stats_doc.exists:
-            search_stats = search_stats_doc.to_dict()
-            total_searches = search_stats.get('personProfileSearches', 0) + search_stats.get('customSearches', 0) + search_stats.get('companyProfileSearches', 0) + search_stats.get('linkedInSearches', 0)
-            data.append({
-                "User": user_data.get('displayName'),
-                "Total Searches": total_searches
-            })
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values("Total Searches", ascending=True)
-
-    fig = px.bar(df, x="Total Searches", y="User", orientation='h', title="Total Searches by Users")
-    fig.update_layout(yaxis={'categoryorder':'total ascending'})
-    st.plotly_chart(fig)
+    rollup = get_overall_rollup(db)
+    render_usage_chart(rollup["users_usage"], rollup["version"])
+
+def usage_trend_chart():
+    resolution = st.radio("Resolution", options=list(RESOLUTIONS), format_func=str.title, horizontal=True)
+    trend = get_usage_trend(db, resolution)
+    if trend.empty:
+        st.caption("No usage history recorded yet; the first samples appear after the next snapshot.")
+    else:
+        st.line_chart(trend["Total Searches"])
+
+def usage_export():
+    # Built only on request, streamed chunk by chunk into a temporary file.
+    export_format = st.radio("Format", options=EXPORT_FORMATS, format_func=str.upper, horizontal=True, key="export_format")
+    if st.button("Prepare export"):
+        with tracked("export"), st.spinner("Exporting..."), tempfile.TemporaryFile() as f:
+            rows = write_usage_export(db, f, export_format)
+            f.seek(0)
+            st.session_state["usage_export"] = (export_format, rows, f.read())
+    if st.session_state.get("usage_export"):
+        export_format, rows, data = st.session_state["usage_export"]
+        mime = "text/csv" if export_format == "csv" else "application/vnd.apache.parquet"
+        st.download_button(f"Download {rows} users ({export_format.upper()})", data, file_name=f"user_usage.{export_format}", mime=mime)
 
-@st.cache_data(ttl=600)
 def get_overall_stats():
-    global users_ref
-    users = users_ref.stream()
-    excluded_users = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
-
-    total_users = 0
-    total_worksheets = 0
-    for user in users:
-        total_users += 1
-        if user.to_dict().get('displayName') in excluded_users:
-            continue
-        worksheets_ref = db.collection('worksheets').document(user.id)
-        worksheets_doc = worksheets_ref.get()
-        if worksheets_doc.exists:
-            user_data = worksheets_doc.to_dict()
-            total_worksheets += len(user_data)
-    
-    return {"total_users": total_users, "total_worksheets": total_worksheets}
+    return get_overall_rollup(db)["overall_stats"]
 
-@st.cache_data(ttl=600)
 def get_overall_usage_stats():
-    global users_ref
-    global search_stats_ref
-    users_ref = db.collection('users')
-    users = users_ref.stream()
-
-    total_users = 0
-    total_searches = 0
-    total_profile_enrichments = 0
-    total_custom_research_prompts = 0
-    total_company_profiles = 0
-    total_linkedin_profiles = 0
-
-    excluded_users = ["Purav Biyani", "Spencer Tate", "Nemath Ahmed"]
-
-    for user in users:
-        user_data = user.to_dict()
-        display_name = user_data.get('displayName', '')
-
-        if display_name in excluded_users:
-            continue
-
-        total_users += 1
-
-        search_stats_doc = search_stats_ref.document(user.id).get()
-        if search_stats_doc.exists:
-            search_stats = search_stats_doc.to_dict()
-            total_profile_enrichments += search_stats.get('personProfileSearches', 0) 
-            total_custom_research_prompts += search_stats.get('customSearches', 0)  
-            total_company_profiles += search_stats.get('companyProfileSearches', 0)
-            total_linkedin_profiles += search_stats.get('linkedInSearches', 0)
-        
-    total_searches += total_profile_enrichments + total_custom_research_prompts + total_company_profiles + total_linkedin_profiles
-
-    return {
-        "total_users": total_users,
-        "total_searches": total_searches,
-        "total_profile_enrichments": total_profile_enrichments,
-        "total_custom_research_prompts": total_custom_research_prompts,
-        "total_company_profiles": total_company_profiles,
-        "total_linkedin_profiles": total_linkedin_profiles
-    }
+    # Same source as the Dashboard's totals.
+    return get_usage_stats(db)
 
 
 with st.container():
     st.title("Overall Stats")
+    rollup_updated_at = get_overall_rollup(db).get("updated_at")
+    if rollup_updated_at:
+        st.caption(f"Rollup updated at {rollup_updated_at:%Y-%m-%d %H:%M:%S %Z}")
 
 overall_stats = get_overall_stats()
 overall_usage_stats = get_overall_usage_stats()
@@ -138,8 +72,19 @@ with st.subheader("Overall Usage Bar Graph"):
     with st.container():
         overall_users_usage_bar_graph()
 
+st.subheader("Export Usage Table")
+with st.container():
+    usage_export()
+
+st.subheader("Usage Trend")
+with st.container():
+    usage_trend_chart()
+
 
 st.subheader("Overall Usage Stats")
+usage_refreshed_at = usage_stats_refreshed_at(db)
+if usage_refreshed_at is not None:
+    st.caption(f"Usage totals updated {format_age(usage_refreshed_at)}")
 with st.container(border=True):
     col3, col4, col5, col6, col7 = st.columns(5)
     
@@ -167,3 +112,5 @@ with st.container(border=True):
         with st.container(border=True):
             st.markdown("LinkedIn Searches")
             st.markdown(overall_usage_stats["total_linkedin_profiles"])
+
+finish_rerun()
@@ -1,69 +1,25 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json  
-from dateutil.parser import parse
-from datetime import timedelta, datetime
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import plotly.express as px
+from datetime import datetime
+
+from bootstrap import get_db
+from data_access import ACTIVATION_FORMAT, PLANS, parse_activation, plan_update
+from instrumentation import finish_rerun, fragment, is_fragment_rerun, start_rerun
+from loaders import get_user_profile, get_user_search_index, get_worksheet_prompts, write_user_plan
+from user_picker import render_user_picker
+from worksheets import render_worksheets_panel
 
 st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+start_rerun("Personal Stats")
 
-service_account_key_path = json.loads(st.secrets["firebase_service"])
-try:
-    firebase_admin.get_app()
-except ValueError as e:
-    cred = credentials.Certificate(service_account_key_path)
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()
-
-users_ref = db.collection('users')
-worksheet_doc_ref = db.collection('worksheets')
-search_stats_ref = db.collection('search-usage')
-
-
-@st.cache_data(ttl=600)
-def get_users():
-    global users_ref
-    users = users_ref.stream()
-    return {user.id: user.to_dict().get('displayName', 'No Name') for user in users}
-    
-def get_user_trials(user_id):
-    global users_ref
-    user_doc = users_ref.document(user_id).get()
-    plan = user_doc.to_dict().get('current_plan', 'No Plan')
-    trial_activation = user_doc.to_dict().get('trial_activated_date')
-    days_left = 0
-    
-    if trial_activation:
-        trial_activation_date = datetime.strptime(trial_activation, "%Y-%m-%dT%H:%M:%S.%f")
-        trial_end_date = trial_activation_date + timedelta(days=14)
-        current_date = datetime.now()
-        
-        days_left = (trial_end_date - current_date).days
-        
-        if days_left < 0:
-            days_left = 0
-
-    return plan, days_left
-
-@st.cache_data(ttl=600)
-def update_user_plan(user_id, new_plan, activation_datetime):
-    global users_ref
-    update_data = {'current_plan': new_plan}
-    
-    activation_datetime = activation_datetime.strftime("%Y-%m-%dT%H:%M:%S.%f")
+db = get_db()
 
-    if new_plan.lower() == 'trial':
-        update_data['trial_activated_date'] = activation_datetime
-    elif new_plan.lower() == 'premium':
-        update_data['last_plan_upgrade_date'] = activation_datetime
+
+def update_user_plan(user_id, new_plan, activation_datetime):
+    activation_datetime = activation_datetime.strftime(ACTIVATION_FORMAT)
+    update_data = plan_update(new_plan, activation_datetime)
 
     try:
-        users_ref.document(user_id).update(update_data)
+        write_user_plan(db, user_id, update_data)
         st.success(f"Plan updated to {new_plan} for user ID: {user_id}.")
         st.success(f"Activation datetime: {activation_datetime}")
         if new_plan.lower() == 'trial':
@@ -73,62 +29,41 @@ def update_user_plan(user_id, new_plan, activation_datetime):
     except Exception as e:
         st.error(f"Failed to update user plan: {e}")
 
-@st.cache_data(ttl=600)
-def get_worksheets(user_id):
-    global worksheet_doc_ref
-    worksheet_doc = worksheet_doc_ref.document(user_id).get()
-    return worksheet_doc.to_dict() if worksheet_doc.exists else {}
-
-@st.cache_data(ttl=600)
-def get_user_stats(user_id):
-    global search_stats_ref
-    search_doc = search_stats_ref.document(user_id).get()
-    if not search_doc.exists:
-        return {
-            "Total Searches": 0,
-            "Person Profiles Enriched": 0,
-            "Company Profiles Enriched": 0,
-            "Custom Research Prompts": 0,
-            "LinkedIn Profile Enriched": 0
-        }
-    person_profile_searches = search_doc.to_dict().get('personProfileSearches', 0)
-    company_profile_searches = search_doc.to_dict().get('companyProfileSearches', 0)
-    custom_searches = search_doc.to_dict().get('customSearches', 0)
-    linkedin_searches = search_doc.to_dict().get('linkedInSearches', 0)
-    return {
-        "Total Searches": person_profile_searches + company_profile_searches + custom_searches + linkedin_searches,
-        "Person Profiles Enriched": person_profile_searches,
-        "Company Profiles Enriched": company_profile_searches,
-        "Custom Research Prompts":  custom_searches,
-        "LinkedIn Profile Enriched": linkedin_searches
-    }
-
-st.title("Personal Stats")
-selected_user_id = st.sidebar.selectbox('Select a User', options=list(get_users().keys()), format_func=lambda x: get_users()[x])
-
-if selected_user_id:
-    st.subheader(f"Worksheets for {get_users()[selected_user_id]}")
-    user_stats = get_user_stats(selected_user_id)
-    user_worksheets = get_worksheets(selected_user_id)
-    if user_worksheets:
-        for worksheet_id, worksheet_data in user_worksheets.items():
-            with st.expander(f"Worksheet: {worksheet_data.get('name', worksheet_id)}"):
-                st.write(f"Rows: {worksheet_data.get('numRows', 'N/A')}")
-                custom_research_prompts = worksheet_data.get("customResearchPrompts", {})
-                if custom_research_prompts:
-                    st.json(custom_research_prompts)
-    else:
-        st.write("No worksheets found.")
-
-with st.sidebar:
+def selected_user():
+    # Fragments read the selection from session state rather than taking it
+    # as an argument, so a fragment-only rerun never acts on a stale user.
+    return st.session_state.get("personal_stats_user")
+
+@fragment("Personal Stats", "user picker")
+def user_picker_panel():
+    # Typing only reruns the picker; a new selection reruns the page.
+    selected_user_id = render_user_picker(get_user_search_index(db))
+    if is_fragment_rerun() and selected_user_id != selected_user():
+        st.rerun()
+    return selected_user_id
+
+@fragment("Personal Stats", "worksheets")
+def worksheets_panel():
+    user_id = selected_user()
+    st.subheader(f"Worksheets for {get_user_search_index(db).name(user_id)}")
+    render_worksheets_panel(
+        user_id,
+        get_user_profile(db, user_id).worksheets,
+        lambda worksheet_id: get_worksheet_prompts(db, user_id, worksheet_id),
+    )
+
+@fragment("Personal Stats", "plan editor")
+def plan_editor_panel():
+    user_id = selected_user()
+    profile = get_user_profile(db, user_id)
     with st.container(border=True):
         st.subheader("Update Plan")
         with st.container():
-            new_plan = st.selectbox("Select Plan", options=["Trial", "Inactive", "Premium"])
+            new_plan = st.selectbox("Select Plan", options=PLANS)
 
             activation_datetime_str = ""    
-            trial_activation_date = users_ref.document(selected_user_id).get().to_dict().get('trial_activated_date')
-            premium_activation_date = users_ref.document(selected_user_id).get().to_dict().get('last_plan_upgrade_date')
+            trial_activation_date = profile.user.get('trial_activated_date')
+            premium_activation_date = profile.user.get('last_plan_upgrade_date')
 
             use_current_datetime = st.checkbox("Use Current Datetime")
 
@@ -136,31 +71,34 @@ with st.sidebar:
                 activation_datetime_str = datetime.now().isoformat()
             else:
                 if new_plan.lower() == 'trial':
-                    activation_datetime_str = st.text_input("Trial Activation Datetime", value=trial_activation_date)
+                    activation_datetime_str = st.text_input("Trial Activation Datetime", value=trial_activation_date or "")
                 elif new_plan.lower() == 'premium':
-                    activation_datetime_str = st.text_input("Premium Activation Datetime", value=premium_activation_date)
+                    activation_datetime_str = st.text_input("Premium Activation Datetime", value=premium_activation_date or "")
                 else:
                     activation_datetime_str = datetime.now().isoformat()
-            
-            if activation_datetime_str.endswith('Z'):
-                activation_datetime_str = activation_datetime_str[:-1]
                         
             if st.button("Update Plan"):
-                activation_datetime = datetime.strptime(activation_datetime_str, "%Y-%m-%dT%H:%M:%S.%f")
-                update_user_plan(selected_user_id, new_plan, activation_datetime)
-
+                activation_datetime = parse_activation(activation_datetime_str)
+                if activation_datetime is None:
+                    st.error(f"Invalid activation datetime: {activation_datetime_str!r}")
+                else:
+                    update_user_plan(user_id, new_plan, activation_datetime)
 
-    user_stats = get_user_stats(selected_user_id)
-    if not user_stats:
-        st.write("No search data found for this user.")
-    else:
-        user_plan = get_user_trials(selected_user_id)
+    if profile.stats():
+        user_plan = get_user_profile(db, user_id).trials()
         if not user_plan:
             st.write("No plan found for this user.")
         else:
             with st.container(border=True):
                 st.markdown(f"**Plan:** {user_plan[0]}")
                 st.markdown(f"**Trial Ends in:** {user_plan[1]} days")
+
+@fragment("Personal Stats", "user stats")
+def user_stats_panel():
+    user_stats = get_user_profile(db, selected_user()).stats()
+    if not user_stats:
+        st.write("No search data found for this user.")
+    else:
         with st.expander("Total Searches", expanded=True):
             st.markdown(f"{user_stats['Total Searches']}")
 
@@ -175,3 +113,20 @@ with st.sidebar:
 
         with st.expander("LinkedIn Profile Enriched", expanded=True):
             st.markdown(f"{user_stats['LinkedIn Profile Enriched']}")
+
+st.title("Personal Stats")
+with st.sidebar:
+    selected_user_id = user_picker_panel()
+st.session_state["personal_stats_user"] = selected_user_id
+
+if selected_user_id is None:
+    finish_rerun()
+    st.stop()
+
+worksheets_panel()
+
+with st.sidebar:
+    plan_editor_panel()
+    user_stats_panel()
+
+finish_rerun()
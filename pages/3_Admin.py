@@ -0,0 +1,101 @@
+import streamlit as st
+import pandas as pd
+
+from bootstrap import get_db, startup_report
+from instrumentation import METRICS_LOG_PATH, collection_metrics, loader_metrics, recent_reruns, rerun_latency, reset_metrics
+from loaders import get_entity_cache, get_full_document_bytes
+from schema import LOADER_FIELDS, bytes_saved_report
+
+st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+
+st.title("Admin")
+
+db = get_db()
+
+st.subheader("Firestore Reads by Loader")
+metrics = loader_metrics()
+if metrics:
+    df = pd.DataFrame.from_dict(metrics, orient="index")
+    df.index.name = "Loader"
+    df["hit_rate"] = df["hits"] / df["calls"].where(df["calls"] > 0)
+    st.dataframe(df.sort_values("documents", ascending=False), use_container_width=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        with st.container(border=True):
+            st.markdown(f"Documents Read: {int(df['documents'].sum())}")
+    with col2:
+        with st.container(border=True):
+            st.markdown(f"RPCs: {int(df['rpcs'].sum())}")
+    with col3:
+        with st.container(border=True):
+            st.markdown(f"Bytes Read: {int(df['bytes'].sum()):,}")
+else:
+    st.write("No loader activity recorded yet.")
+
+st.subheader("Entity Cache")
+entity_cache = get_entity_cache()
+entity_stats = entity_cache.stats()
+if entity_stats:
+    df = pd.DataFrame.from_dict(entity_stats, orient="index")
+    df.index.name = "Kind"
+    lookups = df["hits"] + df["misses"]
+    df["hit_rate"] = df["hits"] / lookups.where(lookups > 0)
+    st.dataframe(df, use_container_width=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        with st.container(border=True):
+            st.markdown(f"Entries: {int(df['entries'].sum())}")
+    with col2:
+        with st.container(border=True):
+            st.markdown(f"Estimated Bytes: {entity_cache.total_bytes():,} of {entity_cache.max_bytes:,}")
+    with col3:
+        with st.container(border=True):
+            total_lookups = int(lookups.sum())
+            hit_rate = df["hits"].sum() / total_lookups if total_lookups else 0
+            st.markdown(f"Hit Rate: {hit_rate:.0%}")
+else:
+    st.write("No entities cached yet.")
+
+st.subheader("Field Projections")
+projected_collections = {
+    collection
+    for collections in LOADER_FIELDS.values()
+    for collection, fields in collections.items()
+    if fields is not None
+}
+if st.toggle("Estimate bytes saved (samples full documents)"):
+    full_document_bytes = {collection: get_full_document_bytes(db, collection) for collection in projected_collections}
+    st.dataframe(pd.DataFrame(bytes_saved_report(collection_metrics(), full_document_bytes)), use_container_width=True)
+
+st.subheader("Recent Reruns")
+reruns = recent_reruns()
+if reruns:
+    # Fragment reruns are listed as "<page>: <fragment>" next to full reruns.
+    latency = pd.DataFrame.from_dict(rerun_latency(reruns), orient="index")
+    latency.index.name = "Rerun"
+    st.dataframe(latency, use_container_width=True)
+    for rerun in reversed(reruns):
+        documents = sum(stats["documents"] for stats in rerun["loaders"].values())
+        with st.expander(f"{rerun['started_at']} · {rerun['page']} · {rerun['wall_ms']:.0f} ms · {documents} documents"):
+            if rerun["loaders"]:
+                st.dataframe(pd.DataFrame.from_dict(rerun["loaders"], orient="index"), use_container_width=True)
+            else:
+                st.write("No loaders called.")
+else:
+    st.write("No reruns recorded yet.")
+
+st.subheader("Startup")
+timings = startup_report()
+if timings:
+    st.dataframe(pd.Series(timings, name="ms").to_frame(), use_container_width=True)
+else:
+    st.write("No startup steps recorded yet.")
+
+if METRICS_LOG_PATH:
+    st.caption(f"Reruns are exported as JSON lines to {METRICS_LOG_PATH}.")
+
+if st.button("Reset Metrics"):
+    reset_metrics()
+    st.rerun()
@@ -0,0 +1,19 @@
+import streamlit as st
+
+from bootstrap import get_db
+from feedback import render_feedback_page
+from instrumentation import finish_rerun, start_rerun
+from loaders import get_feedback
+
+st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+start_rerun("Feedback")
+
+db = get_db()
+
+st.title("Feedback")
+feedback_index = get_feedback(db)
+
+query = st.text_input("Search feedback", placeholder="keywords, or field:value to filter")
+render_feedback_page(feedback_index, query)
+
+finish_rerun()
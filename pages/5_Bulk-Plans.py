@@ -0,0 +1,58 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+from bootstrap import get_db
+from bulk_plans import parse_csv, parse_user_ids, validate
+from data_access import PLANS
+from instrumentation import finish_rerun, start_rerun
+from loaders import get_users, write_user_plans
+
+st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+start_rerun("Bulk Plans")
+
+db = get_db()
+
+st.title("Bulk Plan Update")
+
+default_plan = st.selectbox("Plan", options=PLANS)
+user_ids_text = st.text_area("User IDs", placeholder="One per line, or separated by commas")
+csv_file = st.file_uploader("Or upload a CSV", type="csv", help="A user_id column and an optional plan column; without headers the first column is the user ID.")
+
+rows = [{"user_id": user_id, "plan": None} for user_id in parse_user_ids(user_ids_text)]
+if csv_file is not None:
+    rows.extend(parse_csv(csv_file.getvalue()))
+
+if rows:
+    users = get_users(db)
+    updates, rejected = validate(rows, users, default_plan)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        with st.container(border=True):
+            st.markdown(f"Ready to update: {len(updates)}")
+    with col2:
+        with st.container(border=True):
+            st.markdown(f"Rejected: {len(rejected)}")
+
+    preview = pd.DataFrame(updates + rejected, columns=["user_id", "plan", "status", "error"])
+    preview.insert(1, "name", preview["user_id"].map(users))
+    st.dataframe(preview.fillna({"status": "pending", "error": ""}), use_container_width=True, hide_index=True)
+
+    if updates and st.button(f"Apply to {len(updates)} users", type="primary"):
+        activation_datetime = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")
+        progress = st.progress(0.0, text="Updating plans...")
+        results = write_user_plans(
+            db, updates, activation_datetime,
+            on_progress=lambda done, total: progress.progress(done / total, text=f"Updated {done} of {total}"),
+        )
+        results = pd.DataFrame(results + rejected)
+        failed = (results["status"] == "failed").sum()
+        if failed:
+            st.error(f"{failed} updates failed.")
+        else:
+            st.success(f"Updated {len(updates)} users. Activation datetime: {activation_datetime}")
+        st.dataframe(results, use_container_width=True, hide_index=True)
+        st.download_button("Download results", results.to_csv(index=False), file_name="bulk_plan_results.csv", mime="text/csv")
+
+finish_rerun()
@@ -0,0 +1,38 @@
+import streamlit as st
+
+from bootstrap import get_db
+from instrumentation import finish_rerun, start_rerun
+from loaders import get_active_trials
+from trials import expiry_counts, trial_cohort
+
+st.set_page_config(page_title="Streamlit Firestore Dashboard", layout="wide")
+start_rerun("Trials")
+
+db = get_db()
+
+st.title("Active Trials")
+
+only_trial_plan = st.checkbox("Only users still on the Trial plan", value=True)
+cohort = trial_cohort(get_active_trials(db))
+if only_trial_plan:
+    cohort = cohort[cohort["current_plan"].str.lower() == 'trial']
+
+counts = expiry_counts(cohort)
+columns = st.columns(len(counts))
+for column, (bucket, count) in zip(columns, counts.items()):
+    with column:
+        with st.container(border=True):
+            st.markdown(bucket)
+            st.markdown(count)
+
+bucket = st.radio("Expires", options=["All"] + list(counts.index), horizontal=True)
+if bucket != "All":
+    cohort = cohort[cohort["expires"] == bucket]
+
+st.dataframe(
+    cohort[["displayName", "user_id", "current_plan", "trial_activated_date", "trial_ends", "days_left"]],
+    use_container_width=True,
+    hide_index=True,
+)
+
+finish_rerun()
@@ -0,0 +1,98 @@
+import argparse
+import logging
+
+import pandas as pd
+from google.cloud import firestore as cloud_firestore
+
+from snapshot import load_snapshot, overall_stats, overall_usage_stats, users_usage
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = 'dashboard-rollups'
+TOTALS_DOC = 'totals'
+# Rows per users-N document, well under Firestore's 1 MiB document limit.
+USER_TABLE_CHUNK_SIZE = 2000
+
+
+def compute_rollup(frame):
+    return {
+        "overall_stats": overall_stats(frame),
+        "overall_usage_stats": overall_usage_stats(frame),
+        "users_usage": users_usage(frame),
+    }
+
+
+def write_rollup(db, rollup):
+    rollups_ref = db.collection(ROLLUP_COLLECTION)
+    rows = rollup["users_usage"].to_dict(orient="records")
+    chunks = [rows[start:start + USER_TABLE_CHUNK_SIZE] for start in range(0, len(rows), USER_TABLE_CHUNK_SIZE)]
+
+    previous = rollups_ref.document(TOTALS_DOC).get()
+    previous_chunks = previous.to_dict().get('user_table_chunks', 0) if previous.exists else 0
+
+    batch = db.batch()
+    for index, chunk in enumerate(chunks):
+        batch.set(rollups_ref.document(f'users-{index}'), {"rows": chunk})
+    for index in range(len(chunks), previous_chunks):
+        batch.delete(rollups_ref.document(f'users-{index}'))
+    batch.set(rollups_ref.document(TOTALS_DOC), {
+        "overall_stats": rollup["overall_stats"],
+        "overall_usage_stats": rollup["overall_usage_stats"],
+        "user_table_chunks": len(chunks),
+        "updated_at": cloud_firestore.SERVER_TIMESTAMP,
+    })
+    batch.commit()
+    logger.info("rollup: wrote totals and %d user table chunks", len(chunks))
+
+
+def load_rollup(db):
+    rollups_ref = db.collection(ROLLUP_COLLECTION)
+    totals_doc = rollups_ref.document(TOTALS_DOC).get()
+    if not totals_doc.exists:
+        return None
+    totals = totals_doc.to_dict()
+
+    chunk_refs = [rollups_ref.document(f'users-{index}') for index in range(totals.get('user_table_chunks', 0))]
+    rows = []
+    if chunk_refs:
+        chunks = {doc.id: doc.to_dict() for doc in db.get_all(chunk_refs) if doc.exists}
+        for ref in chunk_refs:
+            rows.extend(chunks.get(ref.id, {}).get('rows', []))
+
+    return {
+        "overall_stats": totals["overall_stats"],
+        "overall_usage_stats": totals["overall_usage_stats"],
+        "users_usage": pd.DataFrame(rows, columns=["User", "Total Searches"]),
+        "updated_at": totals.get("updated_at"),
+        "version": str(totals.get("updated_at")),
+    }
+
+
+def run(db, persist_snapshot=False, snapshot_dir=SNAPSHOT_DIR):
+    # Every run is a full scan. With persist_snapshot the scan also goes
+    # through the on-disk snapshot store, so the app can warm start from it.
+    if persist_snapshot:
+        frame = SnapshotStore(snapshot_dir).sync(db)
+    else:
+        frame = load_snapshot(db)
+    rollup = compute_rollup(frame)
+    write_rollup(db, rollup)
+    return rollup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the Overall Stats rollup documents.")
+    parser.add_argument("--persist-snapshot", action="store_true", help="also write the scan to the local snapshot store (still a full scan)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="snapshot directory used by --persist-snapshot")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from bootstrap import create_client
+
+    rollup = run(create_client(), persist_snapshot=args.persist_snapshot, snapshot_dir=args.snapshot_dir)
+    print(rollup["overall_stats"], rollup["overall_usage_stats"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from data_access import SEARCH_COUNTERS
+from instrumentation import document_bytes
+
+# Fields each loader reads, per collection. None means the loader needs the
+# whole document: worksheet counts and summaries come from the worksheet
+# map's keys, which a field mask cannot select.
+LOADER_FIELDS = {
+    "get_users": {"users": ['displayName']},
+    "snapshot": {"users": ['displayName'], "search-usage": SEARCH_COUNTERS, "worksheets": None},
+    "profile": {"users": None, "search-usage": None, "worksheets": None},
+    "active_trials": {"users": ['displayName', 'current_plan', 'trial_activated_date']},
+}
+
+SAMPLE_SIZE = 20
+
+
+def fields_for(loader, collection):
+    return LOADER_FIELDS[loader][collection]
+
+
+def sample_document_bytes(db, collection, sample_size=SAMPLE_SIZE):
+    # Average size of a full, unprojected document in the collection.
+    docs = list(db.collection(collection).limit(sample_size).stream())
+    if not docs:
+        return 0
+    return sum(document_bytes(doc) for doc in docs) / len(docs)
+
+
+def bytes_saved_report(collection_metrics, full_document_bytes):
+    rows = []
+    for loader, collections in LOADER_FIELDS.items():
+        for collection, fields in collections.items():
+            if fields is None:
+                continue
+            read = collection_metrics.get((loader, collection), {"documents": 0, "bytes": 0})
+            full_bytes = read["documents"] * full_document_bytes.get(collection, 0)
+            rows.append({
+                "Loader": loader,
+                "Collection": collection,
+                "Fields": ", ".join(fields),
+                "Documents": read["documents"],
+                "Bytes Read": read["bytes"],
+                "Bytes Saved (est.)": max(int(full_bytes - read["bytes"]), 0),
+            })
+    return rows
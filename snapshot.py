@@ -0,0 +1,93 @@
+import pandas as pd
+
+from data_access import EXCLUDED_USERS, SEARCH_COUNTERS, get_documents_for_users, log_read_stats, new_read_stats, stream_users
+from schema import fields_for
+
+
+def users_table(docs):
+    return pd.DataFrame(
+        {
+            "displayName": [doc.to_dict().get('displayName') for doc in docs],
+            "update_time": pd.to_datetime([getattr(doc, 'update_time', None) for doc in docs], utc=True),
+        },
+        index=pd.Index([doc.id for doc in docs], name="user_id"),
+    )
+
+
+def search_usage_table(docs):
+    docs = [doc for doc in docs if doc.exists]
+    table = pd.DataFrame.from_dict(
+        {doc.id: doc.to_dict() for doc in docs}, orient="index", columns=SEARCH_COUNTERS, dtype="float64"
+    )
+    table = table.fillna(0).astype("int64")
+    table.index.name = "user_id"
+    table["update_time"] = pd.to_datetime([getattr(doc, 'update_time', None) for doc in docs], utc=True)
+    return table
+
+
+def worksheets_table(docs):
+    docs = [doc for doc in docs if doc.exists]
+    return pd.DataFrame(
+        {
+            "worksheet_count": pd.Series([len(doc.to_dict()) for doc in docs], dtype="int64"),
+            "update_time": pd.to_datetime([getattr(doc, 'update_time', None) for doc in docs], utc=True),
+        }
+    ).set_axis(pd.Index([doc.id for doc in docs], name="user_id"))
+
+
+def included_user_ids(users):
+    return users.index[~users["displayName"].isin(EXCLUDED_USERS)].tolist()
+
+
+def fetch_tables(db, stats):
+    users = users_table(stream_users(db, stats, fields_for("snapshot", "users")))
+    included_ids = included_user_ids(users)
+    search_usage = search_usage_table(get_documents_for_users(
+        db, 'search-usage', included_ids, stats, fields_for("snapshot", "search-usage")).values())
+    worksheets = worksheets_table(get_documents_for_users(
+        db, 'worksheets', included_ids, stats, fields_for("snapshot", "worksheets")).values())
+    return users, search_usage, worksheets
+
+
+def build_frame(users, search_usage, worksheets):
+    frame = users[["displayName"]].copy()
+    frame["excluded"] = frame["displayName"].isin(EXCLUDED_USERS)
+    frame["has_search_usage"] = frame.index.isin(search_usage.index)
+    frame = frame.join(search_usage[SEARCH_COUNTERS])
+    frame[SEARCH_COUNTERS] = frame[SEARCH_COUNTERS].fillna(0).astype("int64")
+    frame["worksheet_count"] = worksheets["worksheet_count"].reindex(frame.index, fill_value=0).astype("int64")
+    return frame
+
+
+def load_snapshot(db):
+    stats = new_read_stats()
+    frame = build_frame(*fetch_tables(db, stats))
+    log_read_stats("load_snapshot", stats)
+    return frame
+
+
+def overall_stats(frame):
+    return {
+        "total_users": len(frame),
+        "total_worksheets": int(frame.loc[~frame["excluded"], "worksheet_count"].sum()),
+    }
+
+
+def overall_usage_stats(frame):
+    totals = frame.loc[~frame["excluded"], SEARCH_COUNTERS].sum()
+    return {
+        "total_users": int((~frame["excluded"]).sum()),
+        "total_searches": int(totals.sum()),
+        "total_profile_enrichments": int(totals['personProfileSearches']),
+        "total_custom_research_prompts": int(totals['customSearches']),
+        "total_company_profiles": int(totals['companyProfileSearches']),
+        "total_linkedin_profiles": int(totals['linkedInSearches'])
+    }
+
+
+def users_usage(frame):
+    rows = frame[~frame["excluded"] & frame["has_search_usage"]]
+    return pd.DataFrame({
+        "User": rows["displayName"],
+        "Total Searches": rows[SEARCH_COUNTERS].sum(axis=1),
+    }).reset_index(drop=True)
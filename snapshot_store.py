@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from data_access import get_documents_for_users, log_read_stats, new_read_stats, stream_users
+from instrumentation import mark_miss, tracked
+from schema import fields_for
+from snapshot import build_frame, included_user_ids, search_usage_table, users_table, worksheets_table
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get("DASHBOARD_SNAPSHOT_DIR", ".snapshot")
+REFRESH_INTERVAL = 600
+
+TABLES = {
+    "users": users_table,
+    "search-usage": search_usage_table,
+    "worksheets": worksheets_table,
+}
+
+
+class SnapshotStore:
+    # Persists the users/search-usage/worksheets tables as Parquet so a fresh
+    # process serves the last snapshot immediately and catches up in the
+    # background. Every sync is a full rescan of the included users.
+
+    def __init__(self, directory=SNAPSHOT_DIR, refresh_interval=REFRESH_INTERVAL):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._frame = None
+        self._synced_at = None
+        self._refreshing = False
+        self._load_from_disk()
+
+    def _path(self, collection):
+        return os.path.join(self.directory, f"{collection}.parquet")
+
+    def _load_from_disk(self):
+        tables = {}
+        for collection in TABLES:
+            path = self._path(collection)
+            if not os.path.exists(path):
+                return
+            tables[collection] = pd.read_parquet(path)
+        self._set_tables(tables, os.path.getmtime(self._path("users")))
+        logger.info("snapshot store: warm start from %s (%d users)", self.directory, len(tables["users"]))
+
+    def _write_to_disk(self, tables):
+        os.makedirs(self.directory, exist_ok=True)
+        for collection, table in tables.items():
+            path = self._path(collection)
+            table.to_parquet(path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+    def _set_tables(self, tables, synced_at):
+        frame = build_frame(tables["users"], tables["search-usage"], tables["worksheets"])
+        with self._lock:
+            self._frame = frame
+            self._synced_at = synced_at
+
+    def sync(self, db, if_empty=False):
+        # With if_empty, callers that waited on another caller's cold load
+        # get its frame instead of scanning again.
+        with self._sync_lock, tracked("snapshot"):
+            if if_empty and self._frame is not None:
+                return self._frame
+            mark_miss()
+            stats = new_read_stats()
+
+            # Every table is replaced with what was read, so documents
+            # deleted in Firestore drop out of the snapshot too.
+            tables = {'users': users_table(stream_users(db, stats, fields_for("snapshot", "users")))}
+            user_ids = included_user_ids(tables['users'])
+            for collection in ('search-usage', 'worksheets'):
+                docs = get_documents_for_users(db, collection, user_ids, stats, fields_for("snapshot", collection))
+                tables[collection] = TABLES[collection](list(docs.values()))
+
+            self._write_to_disk(tables)
+            self._set_tables(tables, time.time())
+            log_read_stats("snapshot_store.sync", stats)
+            return self._frame
+
+    def refresh_in_background(self, db):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        thread = threading.Thread(target=self._sync_quietly, args=(db,), name="snapshot-store-sync", daemon=True)
+        thread.start()
+
+    def _sync_quietly(self, db):
+        try:
+            self.sync(db)
+        except Exception:
+            logger.exception("snapshot store: background sync failed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def frame(self, db):
+        with self._lock:
+            frame = self._frame
+            synced_at = self._synced_at
+        if frame is None:
+            return self.sync(db, if_empty=True)
+        if time.time() - synced_at > self.refresh_interval:
+            self.refresh_in_background(db)
+        return frame
+
+    def synced_at(self):
+        with self._lock:
+            return self._synced_at
@@ -0,0 +1,235 @@
+import functools
+import heapq
+import inspect
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_backends import default_backend
+from instrumentation import bind_context
+
+logger = logging.getLogger(__name__)
+
+# Entries refresh this fraction of their ttl early, minus up to `jitter` of
+# the ttl at random so loaders sharing a ttl do not refresh together.
+REFRESH_EARLY = 0.1
+REFRESH_JITTER = 0.1
+# After a failed refresh the old value is served and the refresh retried.
+RETRY_AFTER = 30
+# How long a single-flight lock is held at most if its holder dies, and how
+# often a cold read waiting on another process's load checks for its value.
+LOCK_TTL = 120
+LOCK_POLL_INTERVAL = 0.5
+REFRESH_WORKERS = 2
+
+_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="swr-refresh")
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = None
+        self.refreshed_at = None
+        self.refresh_at = None
+        self.accessed_at = time.time()
+        self.refreshing = False
+
+
+class _Scheduler:
+    # Refreshes entries when they come due, as long as they were read within
+    # their last ttl; idle entries refresh on their next read instead.
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queue = []
+        self._order = itertools.count()
+        self._thread = None
+
+    def schedule(self, when, cache, key):
+        with self._condition:
+            heapq.heappush(self._queue, (when, next(self._order), key, cache))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="swr-scheduler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.time():
+                    self._condition.wait(self._queue[0][0] - time.time() if self._queue else None)
+                _, _, key, cache = heapq.heappop(self._queue)
+            cache.refresh_due(key)
+
+
+_scheduler = _Scheduler()
+
+
+class SWRCache:
+    # Each process keeps the value it last used per key. Loads go through the
+    # backend: under its single-flight lock only one process recomputes a
+    # key, and the others adopt what it stored.
+
+    def __init__(self, func, ttl, max_age=None, early=REFRESH_EARLY, jitter=REFRESH_JITTER, backend=None):
+        self.func = func
+        self.ttl = ttl
+        self.max_age = max_age
+        self.early = early
+        self.jitter = jitter
+        self.backend = backend or default_backend()
+        self._name = f"{func.__module__}.{func.__qualname__}"
+        self._signature = inspect.signature(func)
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _key(self, args, kwargs):
+        # Like st.cache_data, parameters starting with "_" are not part of
+        # the key.
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = []
+        for name, value in bound.arguments.items():
+            if name.startswith("_"):
+                continue
+            try:
+                hash(value)
+            except TypeError:
+                value = repr(value)
+            key.append((name, value))
+        return tuple(key)
+
+    def _backend_key(self, key):
+        return f"{self._name}:{key!r}"
+
+    def _entry(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _Entry()
+            return self._entries[key]
+
+    def _set(self, entry, value, refreshed_at):
+        entry.value = value
+        entry.refreshed_at = refreshed_at
+        entry.refresh_at = refreshed_at + self.ttl * (1 - self.early) - random.uniform(0, self.jitter * self.ttl)
+
+    def _adopt(self, key, entry):
+        # Takes a newer value another process or thread stored, if any.
+        stored = self.backend.get(self._backend_key(key), newer_than=entry.refreshed_at)
+        if stored is None:
+            return False
+        self._set(entry, *stored)
+        return True
+
+    def _too_old(self, entry):
+        return entry.refreshed_at is None or (self.max_age is not None and time.time() - entry.refreshed_at > self.max_age)
+
+    def _load(self, key, entry, args, kwargs, wait):
+        # Runs with entry.lock held, either inline on a cold read (wait=True)
+        # or in a refresh worker.
+        backend_key = self._backend_key(key)
+        try:
+            while not self.backend.acquire(backend_key, LOCK_TTL):
+                # Another process is loading this key.
+                if not wait:
+                    entry.refresh_at = time.time() + LOCK_POLL_INTERVAL * 2
+                    return
+                time.sleep(LOCK_POLL_INTERVAL)
+                if self._adopt(key, entry) and not self._too_old(entry):
+                    return
+            try:
+                if self._adopt(key, entry) and time.time() < entry.refresh_at:
+                    return
+                value = self.func(*args, **kwargs)
+                self._set(entry, value, time.time())
+                self.backend.set(backend_key, value, entry.refreshed_at)
+            except Exception:
+                if entry.refreshed_at is None:
+                    raise
+                logger.exception("swr: refreshing %s failed, serving the previous value", self._name)
+                entry.refresh_at = time.time() + RETRY_AFTER
+            finally:
+                self.backend.release(backend_key)
+        finally:
+            entry.refreshing = False
+            entry.call = (args, kwargs)
+            if entry.refresh_at is not None:
+                _scheduler.schedule(entry.refresh_at, self, key)
+
+    def _refresh_in_background(self, key, entry):
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+        args, kwargs = entry.call
+
+        def refresh():
+            with entry.lock:
+                self._load(key, entry, args, kwargs, wait=False)
+
+        _executor.submit(bind_context(refresh, rerun=False))
+
+    def refresh_due(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry.refreshed_at is None or time.time() < entry.refresh_at:
+            return
+        if time.time() - entry.accessed_at <= self.ttl:
+            self._refresh_in_background(key, entry)
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        entry = self._entry(key)
+        entry.accessed_at = time.time()
+        if self._too_old(entry):
+            with entry.lock:
+                # Another session may have loaded it while this one waited,
+                # or another process may have stored it; a stored value that
+                # is merely due for refresh is served and refreshed below.
+                if self._too_old(entry):
+                    self._adopt(key, entry)
+                if self._too_old(entry):
+                    self._load(key, entry, args, kwargs, wait=True)
+                entry.call = (args, kwargs)
+        if time.time() >= entry.refresh_at and not self._adopt(key, entry):
+            self._refresh_in_background(key, entry)
+        return entry.value
+
+    def last_refreshed(self, *args, **kwargs):
+        # Wall-clock time the value for these arguments was loaded, or None.
+        with self._lock:
+            entry = self._entries.get(self._key(args, kwargs))
+        return None if entry is None else entry.refreshed_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.backend.clear(f"{self._name}:")
+
+
+def swr_cache(ttl, max_age=None, early=REFRESH_EARLY, jitter=REFRESH_JITTER, backend=None, **_ignored):
+    # Drop-in for st.cache_data(ttl=...): once a value exists it is always
+    # served immediately and refreshed in the background ahead of its ttl.
+    # max_age, if set, is how stale a value may get before a read blocks.
+    # Other st.cache_data options (show_spinner, ...) are ignored.
+    def decorator(func):
+        cache = SWRCache(func, ttl, max_age, early, jitter, backend)
+        wrapper = functools.wraps(func)(lambda *args, **kwargs: cache(*args, **kwargs))
+        wrapper.clear = cache.clear
+        wrapper.last_refreshed = cache.last_refreshed
+        return wrapper
+
+    return decorator
+
+
+def format_age(refreshed_at, now=None):
+    if refreshed_at is None:
+        return "not loaded yet"
+    seconds = int((now or time.time()) - refreshed_at)
+    if seconds < 60:
+        return f"{seconds} s ago"
+    if seconds < 3600:
+        return f"{seconds // 60} min ago"
+    return f"{seconds // 3600} h ago"
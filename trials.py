@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from data_access import ACTIVATION_FORMAT, EXCLUDED_USERS, TRIAL_LENGTH_DAYS, parse_activation
+from schema import fields_for
+
+# Upper bounds (inclusive) of the days-left buckets.
+EXPIRY_BUCKETS = [(0, "Ends today"), (2, "1-2 days"), (7, "3-7 days"), (TRIAL_LENGTH_DAYS, f"8-{TRIAL_LENGTH_DAYS} days")]
+
+
+def load_active_trials(db, now=None):
+    # Only users activated within the trial length are read: the stored ISO
+    # strings sort by time, so a range filter on the string is a time range.
+    cutoff = ((now or datetime.now()) - timedelta(days=TRIAL_LENGTH_DAYS)).strftime(ACTIVATION_FORMAT)
+    query = db.collection('users').where(filter=FieldFilter('trial_activated_date', '>=', cutoff))
+    users = query.select(fields_for("active_trials", "users")).stream()
+    rows = []
+    for user in users:
+        user_data = user.to_dict()
+        rows.append({
+            "user_id": user.id,
+            "displayName": user_data.get('displayName', 'No Name'),
+            "current_plan": user_data.get('current_plan', 'No Plan'),
+            "trial_activated_date": user_data.get('trial_activated_date'),
+        })
+    return pd.DataFrame(rows, columns=["user_id", "displayName", "current_plan", "trial_activated_date"])
+
+
+def activation_datetimes(values):
+    # One vectorized parse; values NumPy rejects are parsed one by one and
+    # left as NaT if they still fail.
+    stripped = np.array([value[:-1] if isinstance(value, str) and value.endswith('Z') else value for value in values], dtype=object)
+    try:
+        return stripped.astype("datetime64[us]")
+    except ValueError:
+        return np.array([parse_activation(value) or np.datetime64("NaT") for value in values], dtype="datetime64[us]")
+
+
+def trial_cohort(trials, now=None):
+    # Adds trial_ends, days_left (whole days, as trial_status counts them)
+    # and an expiry bucket to every row at once.
+    now = np.datetime64(now or datetime.now(), "us")
+    activated = activation_datetimes(trials["trial_activated_date"].tolist())
+    ends = activated + np.timedelta64(TRIAL_LENGTH_DAYS, "D")
+    days_left = np.floor((ends - now) / np.timedelta64(1, "D"))
+
+    cohort = trials.assign(trial_ends=ends, days_left=days_left)
+    cohort = cohort[(cohort["days_left"] >= 0) & ~cohort["displayName"].isin(EXCLUDED_USERS)].copy()
+    cohort["days_left"] = cohort["days_left"].astype("int64")
+    bounds = [bound for bound, _ in EXPIRY_BUCKETS]
+    labels = [label for _, label in EXPIRY_BUCKETS]
+    # Activations dated in the future land in the last bucket.
+    buckets = np.minimum(np.searchsorted(bounds, cohort["days_left"].to_numpy()), len(bounds) - 1)
+    cohort["expires"] = np.array(labels, dtype=object)[buckets]
+    return cohort.sort_values("trial_ends")
+
+
+def expiry_counts(cohort):
+    labels = [label for _, label in EXPIRY_BUCKETS]
+    return cohort["expires"].value_counts().reindex(labels, fill_value=0)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from bootstrap import lazy_import
+from instrumentation import cached_loader
+
+go = lazy_import("plotly.graph_objects")
+
+DEFAULT_TOP_N = 25
+MAX_TOP_N = 200
+# Above this many bars the chart switches to a WebGL trace.
+WEBGL_THRESHOLD = 100
+
+
+def top_users(usage_table, top_n):
+    ranked = usage_table.sort_values("Total Searches", ascending=False)
+    top = ranked.head(top_n)
+    rest = ranked.iloc[top_n:]
+    if not rest.empty:
+        others = pd.DataFrame({
+            "User": [f"Others ({len(rest)} users)"],
+            "Total Searches": [int(rest["Total Searches"].sum())],
+        })
+        top = pd.concat([top, others], ignore_index=True)
+    return top
+
+
+def search_distribution(usage_table):
+    # Users per power-of-two bucket of total searches: 0, 1, 2-3, 4-7, ...
+    searches = usage_table["Total Searches"].to_numpy()
+    buckets = np.zeros(len(searches), dtype="int64")
+    positive = searches > 0
+    buckets[positive] = np.floor(np.log2(searches[positive])).astype("int64") + 1
+    counts = np.bincount(buckets, minlength=1) if len(buckets) else np.zeros(1, dtype="int64")
+
+    labels = []
+    for bucket in range(len(counts)):
+        if bucket == 0:
+            labels.append("0")
+        else:
+            low, high = 2 ** (bucket - 1), 2 ** bucket - 1
+            labels.append(str(low) if low == high else f"{low}-{high}")
+    return pd.DataFrame({"Total Searches": labels, "Users": counts})
+
+
+def build_top_users_figure(data):
+    data = data.iloc[::-1]
+    if len(data) > WEBGL_THRESHOLD:
+        trace = go.Scattergl(x=data["Total Searches"], y=data["User"], mode="markers")
+    else:
+        trace = go.Bar(x=data["Total Searches"], y=data["User"], orientation="h")
+    fig = go.Figure(trace)
+    fig.update_layout(title="Total Searches by Users", yaxis={'type': 'category'}, height=max(400, 18 * len(data)))
+    return fig
+
+
+def build_distribution_figure(data):
+    fig = go.Figure(go.Bar(x=data["Total Searches"], y=data["Users"]))
+    fig.update_layout(title="Users by Total Searches", xaxis={'type': 'category'}, yaxis={'title': "Users"})
+    return fig
+
+
+@cached_loader("usage_chart", ttl=600)
+def get_usage_chart(_usage_table, version, mode, top_n):
+    # Only the small figure is cached; `version` ties it to the data it was
+    # built from since the table itself is not hashed.
+    if mode == "distribution":
+        return build_distribution_figure(search_distribution(_usage_table))
+    return build_top_users_figure(top_users(_usage_table, top_n))
+
+
+def render_usage_chart(usage_table, version):
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        mode = st.radio("View", options=["top", "distribution"],
+                        format_func={"top": "Top users", "distribution": "Distribution"}.get, horizontal=True)
+    with col2:
+        top_n = DEFAULT_TOP_N
+        if mode == "top":
+            top_n = st.slider("Users shown", min_value=5, max_value=MAX_TOP_N, value=DEFAULT_TOP_N, step=5)
+    st.plotly_chart(get_usage_chart(usage_table, version, mode, top_n), use_container_width=True)
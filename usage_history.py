@@ -0,0 +1,155 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from aggregations import excluded_user_ids
+from data_access import SEARCH_COUNTERS
+from snapshot_store import SNAPSHOT_DIR
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = os.environ.get("DASHBOARD_HISTORY_PATH", os.path.join(SNAPSHOT_DIR, "usage_history.sqlite"))
+RECORD_INTERVAL = int(os.environ.get("DASHBOARD_HISTORY_INTERVAL", 3600))
+
+# SQLite expressions that truncate recorded_at (epoch seconds) per resolution.
+RESOLUTIONS = {
+    "daily": "date(recorded_at, 'unixepoch')",
+    "weekly": "date(recorded_at, 'unixepoch', 'weekday 0', '-6 days')",
+    "monthly": "strftime('%Y-%m-01', recorded_at, 'unixepoch')",
+}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS latest (
+    user_id TEXT PRIMARY KEY,
+    {", ".join(f"{counter} INTEGER NOT NULL" for counter in SEARCH_COUNTERS)},
+    recorded_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deltas (
+    recorded_at INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    {", ".join(f"{counter} INTEGER NOT NULL" for counter in SEARCH_COUNTERS)}
+);
+CREATE INDEX IF NOT EXISTS deltas_recorded_at ON deltas (recorded_at);
+CREATE INDEX IF NOT EXISTS deltas_user_recorded_at ON deltas (user_id, recorded_at);
+"""
+
+
+def load_usage_counters(db):
+    # Only the search counters and the few excluded users' ids are read, so
+    # a sample never touches the users' worksheets.
+    excluded_ids = set(excluded_user_ids(db))
+    docs = db.collection('search-usage').select(SEARCH_COUNTERS).stream()
+    rows = {doc.id: [int((doc.to_dict() or {}).get(counter, 0) or 0) for counter in SEARCH_COUNTERS] for doc in docs}
+    frame = pd.DataFrame.from_dict(rows, orient="index", columns=SEARCH_COUNTERS, dtype="int64")
+    frame["excluded"] = frame.index.isin(excluded_ids)
+    return frame
+
+
+class UsageHistory:
+    # Stores only the per-user counter changes between samples, so history
+    # grows with activity rather than with users x samples.
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, frame, now=None):
+        # `now` is when the frame was read. Processes sharing the file record
+        # one at a time, and a sample older than the last one recorded is
+        # skipped rather than written as negative changes.
+        recorded_at = int(now if now is not None else time.time())
+        current = frame.loc[~frame["excluded"], SEARCH_COUNTERS].astype("int64")
+
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            last_recorded_at = connection.execute("SELECT MAX(recorded_at) FROM latest").fetchone()[0]
+            if last_recorded_at is not None and last_recorded_at > recorded_at:
+                logger.info("usage history: skipped a sample older than the last one recorded")
+                return 0
+            latest = pd.read_sql_query(f"SELECT user_id, {', '.join(SEARCH_COUNTERS)} FROM latest", connection, index_col="user_id")
+            if latest.empty:
+                # The first sample is the baseline; it has no change to record.
+                changed = current.iloc[:0]
+            else:
+                previous = latest.reindex(current.index, fill_value=0)
+                changed = current - previous
+                changed = changed[(changed != 0).any(axis=1)]
+
+            connection.executemany(
+                f"INSERT INTO deltas (recorded_at, user_id, {', '.join(SEARCH_COUNTERS)}) VALUES (?, ?, {', '.join('?' * len(SEARCH_COUNTERS))})",
+                [(recorded_at, user_id, *map(int, row)) for user_id, row in zip(changed.index, changed.to_numpy())],
+            )
+            updated = current if latest.empty else current.loc[changed.index]
+            connection.executemany(
+                f"INSERT OR REPLACE INTO latest (user_id, {', '.join(SEARCH_COUNTERS)}, recorded_at) VALUES (?, {', '.join('?' * len(SEARCH_COUNTERS))}, ?)",
+                [(user_id, *map(int, row), recorded_at) for user_id, row in zip(updated.index, updated.to_numpy())],
+            )
+        logger.info("usage history: recorded %d changed users", len(changed))
+        return len(changed)
+
+    def trend(self, resolution="daily", since=None, user_id=None):
+        bucket = RESOLUTIONS[resolution]
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("recorded_at >= ?")
+            params.append(int(since))
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f"""
+            SELECT {bucket} AS period, {", ".join(f"SUM({counter}) AS {counter}" for counter in SEARCH_COUNTERS)}
+            FROM deltas {where}
+            GROUP BY period
+            ORDER BY period
+        """
+        with self._connect() as connection:
+            trend = pd.read_sql_query(query, connection, params=params, parse_dates=["period"])
+        trend = trend.set_index("period")
+        trend["Total Searches"] = trend[SEARCH_COUNTERS].sum(axis=1)
+        return trend
+
+
+class HistoryRecorder:
+    # Samples the usage counters into the history store on a fixed interval.
+
+    def __init__(self, history, load_frame, interval=RECORD_INTERVAL):
+        self.history = history
+        self.load_frame = load_frame
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="usage-history-recorder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                started = time.time()
+                self.history.record(self.load_frame(), now=started)
+            except Exception:
+                logger.exception("usage history: sample failed")
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+if __name__ == "__main__":
+    # One sample per invocation, for running from cron instead of in-process.
+    logging.basicConfig(level=logging.INFO)
+    from bootstrap import create_client
+
+    started = time.time()
+    UsageHistory().record(load_usage_counters(create_client()), now=started)
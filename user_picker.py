@@ -0,0 +1,83 @@
+import bisect
+import difflib
+
+import streamlit as st
+
+MAX_MATCHES = 50
+# Fuzzy matching only kicks in for terms this long with too few prefix hits.
+FUZZY_MIN_LENGTH = 3
+FUZZY_CUTOFF = 0.75
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+class UserSearchIndex:
+    # Prefix and fuzzy search over display names, built once per user map so
+    # a rerun only ships the top matches to the browser.
+
+    def __init__(self, users):
+        self._names = dict(users)
+        self._by_name = sorted(self._names, key=lambda user_id: (normalize(self._names[user_id]), user_id))
+        # Sorted (name suffix starting at each word, user id) pairs: a bisect
+        # finds every user with a word starting with the query.
+        entries = set()
+        for user_id, name in self._names.items():
+            words = normalize(name).split()
+            for start in range(len(words)):
+                entries.add((" ".join(words[start:]), user_id))
+            entries.add((normalize(user_id), user_id))
+        self._entries = sorted(entries)
+        self._keys = [entry[0] for entry in self._entries]
+        self._words = sorted({word for name in self._names.values() for word in normalize(name).split()})
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, user_id):
+        return user_id in self._names
+
+    def name(self, user_id):
+        return self._names.get(user_id, 'No Name')
+
+    def _prefix_matches(self, query):
+        position = bisect.bisect_left(self._keys, query)
+        matches = set()
+        while position < len(self._keys) and self._keys[position].startswith(query):
+            matches.add(self._entries[position][1])
+            position += 1
+        return matches
+
+    def search(self, query, limit=MAX_MATCHES):
+        # Names starting with the query first, then names with a later word
+        # starting with it, then fuzzy matches on a single word.
+        query = normalize(query)
+        if not query:
+            return self._by_name[:limit]
+
+        matches = self._prefix_matches(query)
+        ranked = sorted(matches, key=lambda user_id: (not normalize(self._names[user_id]).startswith(query), normalize(self._names[user_id]), user_id))
+        if len(ranked) < limit and len(query) >= FUZZY_MIN_LENGTH and " " not in query:
+            fuzzy = set()
+            for word in difflib.get_close_matches(query, self._words, n=limit, cutoff=FUZZY_CUTOFF):
+                fuzzy |= self._prefix_matches(word)
+            ranked.extend(sorted(fuzzy - matches, key=lambda user_id: (normalize(self._names[user_id]), user_id)))
+        return ranked[:limit]
+
+
+def render_user_picker(index, container=st, key="user_picker"):
+    # Returns the selected user id, or None when nothing matches.
+    query = container.text_input("Search users", key=f"{key}_query", placeholder=f"{len(index)} users")
+    matches = index.search(query)
+    if not matches:
+        container.caption("No matching users.")
+        return None
+
+    # The selectbox resets when its options change, so the last selection is
+    # carried over while it is still among the matches.
+    selected = st.session_state.get(f"{key}_selected")
+    position = matches.index(selected) if selected in matches else 0
+    selected = container.selectbox('Select a User', options=matches, index=position, format_func=index.name)
+    st.session_state[f"{key}_selected"] = selected
+    return selected
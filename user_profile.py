@@ -0,0 +1,53 @@
+from dataclasses import dataclass, field, replace
+
+from data_access import trial_status
+
+WORKSHEET_SUMMARY_FIELDS = ('name', 'numRows')
+
+
+@dataclass(frozen=True)
+class UserProfileBundle:
+    user_id: str
+    user: dict = field(default_factory=dict)
+    search_usage: dict = field(default_factory=dict)
+    # Worksheet id -> name/numRows only; prompts are loaded per worksheet.
+    worksheets: dict = field(default_factory=dict)
+
+    def stats(self):
+        person_profile_searches = self.search_usage.get('personProfileSearches', 0)
+        company_profile_searches = self.search_usage.get('companyProfileSearches', 0)
+        custom_searches = self.search_usage.get('customSearches', 0)
+        linkedin_searches = self.search_usage.get('linkedInSearches', 0)
+        return {
+            "Total Searches": person_profile_searches + company_profile_searches + custom_searches + linkedin_searches,
+            "Person Profiles Enriched": person_profile_searches,
+            "Company Profiles Enriched": company_profile_searches,
+            "Custom Research Prompts": custom_searches,
+            "LinkedIn Profile Enriched": linkedin_searches
+        }
+
+    def trials(self, now=None):
+        return trial_status(self.user, now)
+
+    def with_user_update(self, update_data):
+        return replace(self, user={**self.user, **update_data})
+
+
+def worksheet_summaries(worksheets_doc):
+    return {
+        worksheet_id: {field: worksheet_data[field] for field in WORKSHEET_SUMMARY_FIELDS if field in worksheet_data}
+        for worksheet_id, worksheet_data in worksheets_doc.items()
+    }
+
+
+def load_user_profile(db, user_id):
+    # One BatchGetDocuments call fetches all three documents together.
+    refs = [db.collection(collection_name).document(user_id) for collection_name in ('users', 'search-usage', 'worksheets')]
+    docs = {doc.reference.path: doc for doc in db.get_all(refs)}
+
+    def data(ref):
+        doc = docs.get(ref.path)
+        return doc.to_dict() if doc is not None and doc.exists else {}
+
+    users_ref, search_usage_ref, worksheets_ref = refs
+    return UserProfileBundle(user_id, data(users_ref), data(search_usage_ref), worksheet_summaries(data(worksheets_ref)))
@@ -0,0 +1,39 @@
+import math
+
+import streamlit as st
+from google.cloud.firestore_v1.field_path import FieldPath
+
+WORKSHEETS_PAGE_SIZE = 20
+
+
+def load_worksheet_prompts(db, user_id, worksheet_id):
+    field_path = FieldPath(worksheet_id, 'customResearchPrompts').to_api_repr()
+    worksheet_doc = db.collection('worksheets').document(user_id).get(field_paths=[field_path])
+    if not worksheet_doc.exists:
+        return {}
+    return worksheet_doc.to_dict().get(worksheet_id, {}).get('customResearchPrompts', {})
+
+
+def render_worksheets_panel(user_id, summaries, load_prompts, page_size=WORKSHEETS_PAGE_SIZE):
+    if not summaries:
+        st.write("No worksheets found.")
+        return
+
+    worksheet_ids = list(summaries)
+    page_count = math.ceil(len(worksheet_ids) / page_size)
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key=f"worksheets_page_{user_id}")
+
+    for worksheet_id in worksheet_ids[(page - 1) * page_size:page * page_size]:
+        worksheet_data = summaries[worksheet_id]
+        with st.expander(f"Worksheet: {worksheet_data.get('name', worksheet_id)}"):
+            st.write(f"Rows: {worksheet_data.get('numRows', 'N/A')}")
+            # Expander bodies always execute, so the prompt read is gated on
+            # an explicit toggle rather than on the expander being open.
+            if st.toggle("Show research prompts", key=f"worksheet_prompts_{user_id}_{worksheet_id}"):
+                custom_research_prompts = load_prompts(worksheet_id)
+                if custom_research_prompts:
+                    st.json(custom_research_prompts)
+                else:
+                    st.write("No research prompts.")